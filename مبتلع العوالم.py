@@ -1,6 +1,5 @@
 import os
 import sys
-import sqlite3
 import json
 import random
 import time
@@ -9,10 +8,39 @@ import logging
 import shlex
 import re
 import threading
+import functools
+import heapq
+import itertools
+import zlib
+from bisect import bisect_right
+from collections import Counter, OrderedDict, deque
 from dataclasses import dataclass, field
-from typing import Dict, List, Any, Optional, Tuple, Set, Union
+from typing import Dict, List, Any, Optional, Tuple, Set, Union, Callable
 from enum import Enum
 
+try:
+    import orjson as _orjson  # اختياري: تشفير/تحليل JSON أسرع بكثير إن وُجد
+except ImportError:
+    _orjson = None
+
+try:
+    import readline  # اختياري: سجل الأسهم وتحرير السطر في الـ REPL (غير متاح على ويندوز)
+except ImportError:
+    readline = None
+
+def json_loads(s):
+    return _orjson.loads(s) if _orjson is not None else json.loads(s)
+
+def json_dumps(obj) -> str:
+    if _orjson is not None:
+        return _orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+def json_dumps_pretty(obj) -> str:
+    if _orjson is not None:
+        return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2 | _orjson.OPT_SORT_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=True)
+
 # ---------------------------
 # إعدادات الألوان للنصوص
 # ---------------------------
@@ -42,33 +70,70 @@ CONFIG = {
     "TICK_INTERVAL_SEC": 10,
     "TICKS_PER_RUN": 1,
     "MAX_WORLD_TICKS_PER_RUN": 10,
-    "SAVE_EVERY_RUN": True,
+    "SAVE_BATCH_INTERVAL_SEC": 30,
     "WORLD_POOL_MIN": 10,
     "MAX_CREATURES_PER_WORLD": 50,
     "MAX_SNAPSHOTS_PER_WORLD": 30,
     "CACHE_CLEANUP_INTERVAL": 300,
-    "MIN_CREATURE_SPAWN": 2
+    "MIN_CREATURE_SPAWN": 2,
+    "MAX_TRANSACTIONS": 1000,
+    "WORLD_CACHE_MAX": 64
 }
 
 random.seed(RANDOM_SEED)
-logging.basicConfig(
-    filename=LOG_FILE, 
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    encoding='utf-8'
-)
+
+# سقف طاقة اللاعب: ثابت واحد بدل تكرار الحرفية في كل مسار شحن
+QI_MAX = 5000.0
+
+# سقف عدد العنصر الواحد: النمو المركب يضاعف الأعداد أسيًا (حتى ×1.8 لكل
+# دورة للأعشاب) فيتجاوز حد int64 في SQLite خلال دقائق من الدورة الخلفية؛
+# القيم فوق هذا السقف بلا معنى لعبيًا أصلًا
+ELEMENT_MAX = 10**12
+
+_LOG_READY = False
+# مسجل واحد للوحدة: يؤجل تنسيق %s إلى لحظة الكتابة الفعلية في السجل
+_LOG = logging.getLogger(__name__)
+
+def _ensure_logging():
+    """تهيئة السجل عند أول حاجة فعلية بدل فتح الملف عند الاستيراد"""
+    global _LOG_READY
+    if not _LOG_READY:
+        logging.basicConfig(
+            filename=LOG_FILE,
+            level=logging.INFO,
+            format='%(asctime)s [%(levelname)s] %(message)s',
+            encoding='utf-8'
+        )
+        _LOG_READY = True
+
+def _normalize_game_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """تحويل الحقول الرقمية النصية إلى أرقام مرة واحدة عند التحميل"""
+    for prof_data in data.get("PROFESSIONS", {}).values():
+        for key, cast in (("production", int), ("bonuses", float)):
+            section = prof_data.get(key)
+            if section:
+                prof_data[key] = {k: cast(v) for k, v in section.items()}
+    for building_data in data.get("BUILDINGS", {}).values():
+        for key, cast in (("cost", int), ("effects", float)):
+            section = building_data.get(key)
+            if section:
+                building_data[key] = {k: cast(v) for k, v in section.items()}
+    return data
 
 def load_game_data(filename: str) -> Dict[str, Any]:
     try:
         with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return _normalize_game_data(json_loads(f.read()))
     except (FileNotFoundError, json.JSONDecodeError) as e:
+        _ensure_logging()
         logging.critical(f"FATAL: Could not load game data from {filename}: {e}")
         sys.exit(f"خطأ فادح: لا يمكن تحميل بيانات اللعبة من {filename}")
 
 GAME_DATA = load_game_data(GAME_DATA_FILE)
-BLOCKS = GAME_DATA["BLOCKS"]
-CREATURES = GAME_DATA["CREATURES"]
+# مفاتيح الكتل والمخلوقات تُدمج (intern) عند التحميل: مقارنات الهوية السريعة
+# في بحث القواميس لأن المعرفات نفسها تتكرر في كل حلقة محاكاة وعرض
+BLOCKS = {sys.intern(k): v for k, v in GAME_DATA["BLOCKS"].items()}
+CREATURES = {sys.intern(k): v for k, v in GAME_DATA["CREATURES"].items()}
 PREDATION = GAME_DATA["PREDATION"]
 DIET_TO_RESOURCES = GAME_DATA["DIET_TO_RESOURCES"]
 BIOMES = GAME_DATA["BIOMES"]
@@ -86,30 +151,57 @@ CURRENCY = GAME_DATA.get("CURRENCY", {})
 # ---------------------------
 AR_FAKE_MAP = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه', 'ٱ': 'ا'}
 
+try:
+    import re2 as _re2  # \u0627\u062E\u062A\u064A\u0627\u0631\u064A: \u0645\u062D\u0631\u0643 DFA \u062E\u0637\u064A \u0628\u0644\u0627 \u062A\u0631\u0627\u062C\u0639 \u0644\u0644\u0645\u062F\u062E\u0644\u0627\u062A \u0627\u0644\u0637\u0648\u064A\u0644\u0629
+except ImportError:
+    _re2 = None
+
+# \u062C\u062F\u0627\u0648\u0644 \u0648\u0623\u0646\u0645\u0627\u0637 \u0645\u062D\u0636\u0631\u0629 \u0645\u0633\u0628\u0642\u0627\u064B \u0644\u0644\u062A\u0637\u0628\u064A\u0639: \u062A\u0645\u0631\u064A\u0631\u0629 \u0648\u0627\u062D\u062F\u0629 \u0628\u062F\u0644 8 \u062A\u0645\u0631\u064A\u0631\u0627\u062A replace
+_AR_TRANS = str.maketrans(AR_FAKE_MAP)
+_AR_STRIP_RE = (_re2 or re).compile(r'[^0-9a-z\u0600-\u06FF\s_:#@-]')
+_AR_WS_RE = (_re2 or re).compile(r'\s+')
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_ar_cached(s: str) -> str:
+    s = s.strip().lower().translate(_AR_TRANS)
+    s = _AR_STRIP_RE.sub('', s)
+    return _AR_WS_RE.sub(' ', s)
+
 def normalize_ar_text(s: str) -> str:
     if not isinstance(s, str): return s
-    s = s.strip().lower()
-    for k,v in AR_FAKE_MAP.items():
-        s = s.replace(k,v)
-    s = re.sub(r'[^0-9a-z\u0600-\u06FF\s_:#@-]', '', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s
+    return _normalize_ar_cached(s)
+
+_DIGIT_TRANS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
 
 def normalize_digits(s: str) -> str:
-    arabic_digits = "٠١٢٣٤٥٦٧٨٩"
-    western_digits = "0123456789"
-    return s.translate(str.maketrans(arabic_digits, western_digits))
+    return s.translate(_DIGIT_TRANS)
 
-def parse_input_line(line: str):
+@functools.lru_cache(maxsize=256)
+def parse_input_line(line: str) -> Tuple[str, ...]:
+    """تحليل سطر إدخال؛ دالة نقية فتُخزَّن نتائج الأسطر المتكررة (tick، مخزن...)"""
     line = normalize_digits(line)
     try:
         parts = shlex.split(line)
     except Exception:
         parts = line.strip().split()
-    return parts
+    return tuple(parts)
 
 def make_key(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:6]}"
+    # os.urandom أرخص من بناء UUID كامل ثم اقتطاع 6 أحرف منه
+    return f"{prefix}_{os.urandom(3).hex()}"
+
+# معرفات المخلوقات: عداد متزايد يبدأ من بذرة عشوائية لكل عملية تشغيل
+# (فريد داخل ملف الحفظ بلا قراءة urandom لكل مخلوق)
+_uid_counter = itertools.count(int.from_bytes(os.urandom(5), "big"))
+_B36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def make_creature_uid(spec_id: str) -> str:
+    n = next(_uid_counter)
+    digits = []
+    while n:
+        n, r = divmod(n, 36)
+        digits.append(_B36[r])
+    return f"{spec_id}_{''.join(reversed(digits)) or '0'}"
 
 def safe_filename(name: str) -> str:
     name = os.path.basename(name)
@@ -117,13 +209,91 @@ def safe_filename(name: str) -> str:
         name += '.json'
     return name
     
+# جدول الندرة يبنى مرة واحدة؛ النقص في البيانات يسجل هنا لا عند كل استدعاء
+_RARITY = {bid: block.get("rarity", 1.0) for bid, block in BLOCKS.items()}
+for _bid, _block in BLOCKS.items():
+    if "rarity" not in _block:
+        _ensure_logging()
+        _LOG.warning("Invalid block data for ID: %s. Rarity not found.", _bid)
+
 def get_rarity(block_id: str) -> float:
     """الحصول على ندرة المورد، مع قيمة افتراضية إذا كانت البيانات غير صالحة."""
-    block_data = BLOCKS.get(block_id)
-    if not block_data or "rarity" not in block_data:
-        logging.warning(f"Invalid block data for ID: {block_id}. Rarity not found.")
-        return 1.0
-    return block_data["rarity"]
+    return _RARITY.get(block_id, 1.0)
+
+# أسماء الكتل معدّة مسبقًا: BLOCKS.get(k, {'name': k})['name'] يبني قاموسًا
+# مؤقتًا عند كل استدعاء حتى مع وجود المفتاح
+_BLOCK_NAMES = {bid: block.get("name", bid) for bid, block in BLOCKS.items()}
+
+def block_name(block_id: str) -> str:
+    """الاسم المعروض للكتلة، أو المعرف نفسه إن لم تكن معروفة."""
+    return _BLOCK_NAMES.get(block_id, block_id)
+
+# جداول مواصفات المخلوقات المسطّحة: حلقات المحاكاة تقرأ قيمة واحدة لكل مخلوق،
+# فتُستخرج الحقول الساخنة مرة واحدة بدل سلسلة CREATURES[sid]["field"] كل دورة
+_SPEC_ENERGY_MAX = {sid: s.get("energy_max", 1) for sid, s in CREATURES.items()}
+_SPEC_LIFESPAN = {sid: s.get("lifespan", 1000) for sid, s in CREATURES.items()}
+_SPEC_REPRO = {sid: s.get("repro", 0.0) for sid, s in CREATURES.items()}
+_SPEC_QI_PROD = {sid: s.get("qi_production", 0.0) for sid, s in CREATURES.items()}
+# قائمة موارد الغذاء لكل نوع محسومة مسبقًا من نظامه الغذائي،
+# وطاقة الغذاء الفعلية (بعد معامل 0.9) جاهزة لكل كتلة
+_SPEC_DIET_POOL = {sid: tuple(DIET_TO_RESOURCES.get(s.get("diet"), ()))
+                   for sid, s in CREATURES.items()}
+# زوج (الاسم، الطاقة القصوى) لكل نوع: حلقات العرض تقرأ بحثًا واحدًا لكل مخلوق
+_SPEC_DISPLAY = {sid: (s["name"], s.get("energy_max", 1))
+                 for sid, s in CREATURES.items()}
+_BLOCK_FOOD_ENERGY = {bid: b.get("energy", 0) * 0.9 for bid, b in BLOCKS.items()}
+# صفوف مفاتيح جاهزة للاختيار العشوائي بدل list(dict.keys()) عند كل حدث
+_BLOCK_KEYS = tuple(BLOCKS)
+_BIOME_KEYS = tuple(BIOMES)
+# الكتل القابلة للنمو فقط: حلقة النمو تمر عليها بدل مسح BLOCKS كلها كل دورة
+_GROWABLE_BLOCKS = [(bid, b["grow_rate"], b.get("name", bid))
+                    for bid, b in BLOCKS.items()
+                    if b.get("grow_rate", 0.0) > 0]
+
+# جداول الافتراس: فرائس كل مفترس كمجموعات (عضوية O(1) بدل مسح القائمة)
+# مع حصر المفترسات الفعلية (آكلة لحوم ولها فرائس معرفة) في مجموعة واحدة
+_PREY_SETS = {sid: frozenset(prey) for sid, prey in PREDATION.items()}
+_ACTIVE_PREDATORS = frozenset(
+    sid for sid, s in CREATURES.items()
+    if s.get("diet") == "carnivore" and sid in _PREY_SETS
+)
+
+# علاقات العناصر مقسومة حسب النوع: حلقات المحاكاة تمر على الجدول الثابت
+# الصغير وتفحص وجود العنصر، بدل نسخ قاموس عناصر العالم كله كل دورة
+_REL_GROWTH = [(eid, tuple(r["requires"]), r["growth_rate"])
+               for eid, r in ELEMENT_RELATIONSHIPS.items()
+               if "requires" in r and "growth_rate" in r]
+_REL_PRODUCES = [(eid, tuple(r["produces"]))
+                 for eid, r in ELEMENT_RELATIONSHIPS.items() if "produces" in r]
+_REL_DECAYS = [(eid, r["decays_to"])
+               for eid, r in ELEMENT_RELATIONSHIPS.items() if "decays_to" in r]
+
+# معرفات المباني كصف جاهز للاختيار العشوائي في تطور المستوطنات
+# (التكاليف المجمدة في _BUILDING_COSTS معرفة مع نظام البناء أدناه)
+_BUILDING_IDS = tuple(BUILDINGS)
+
+# احتمالات الكتل المطبّعة لكل بايوم: تحسب مرة واحدة بدل قسمة المجموع عند كل توليد
+_BIOME_BLOCK_DIST = {}
+for _bk, _bd in BIOMES.items():
+    _w = _bd.get("block_weights", {})
+    _tw = sum(_w.values()) or 1.0
+    _BIOME_BLOCK_DIST[_bk] = (tuple(_w.keys()), tuple(v / _tw for v in _w.values()))
+
+# أسماء البايومات: بحث واحد في قاموس مسطّح بدل إنشاء قاموس احتياطي عند كل صف
+BIOME_NAMES = {k: v.get("name", k) for k, v in BIOMES.items()}
+
+# خريطة أسماء المهارات العربية، ونسخة مطبّعة مسبقًا لاستعلام واحد في develop_skill
+SKILL_NAME_MAP = {
+    "ابتلاع": "ingestion_efficiency",
+    "طاقة": "qi_mastery",
+    "زراعة": "cultivation",
+    "قتال": "combat",
+    "بناء": "building",
+    "تجارة": "trading",
+    "جمع": "gathering",
+    "صنعة": "crafting"
+}
+_NORM_SKILL_MAP = {normalize_ar_text(k): v for k, v in SKILL_NAME_MAP.items()}
 
 def colored_text(text: str, color: str) -> str:
     """إضافة ألوان للنصوص لتحسين تجربة المستخدم"""
@@ -132,35 +302,39 @@ def colored_text(text: str, color: str) -> str:
 # ---------------------------
 # أنظمة تحقيق الإنجازات
 # ---------------------------
+def _default_achievements() -> Dict[str, Dict[str, Any]]:
+    return {
+        "first_ingestion": {"name": "أول ابتلاع", "desc": "ابتلاع أول عالم", "unlocked": False},
+        "master_ingester": {"name": "سيد الابتلاع", "desc": "ابتلاع 10 عوالم", "unlocked": False, "count": 0},
+        "ecosystem_balance": {"name": "توازن بيئي", "desc": "الحفاظ على 5 مخلوقات لمدة 10 تيكس", "unlocked": False},
+        "craft_master": {"name": "سيد الصنعة", "desc": "صنع 5 عناصر مختلفة", "unlocked": False, "count": 0},
+        "settlement_founder": {"name": "مؤسس المستوطنة", "desc": "إنشاء أول مستوطنة", "unlocked": False},
+        "skill_master": {"name": "سيد المهارات", "desc": "الوصول لمستوى 10 في 3 مهارات", "unlocked": False},
+        "trade_master": {"name": "سيد التجارة", "desc": "إجراء 50 صفقة تجارية", "unlocked": False, "count": 0},
+        "settlement_ruler": {"name": "حاكم المستوطنات", "desc": "امتلاك 3 مستوطنات", "unlocked": False, "count": 0}
+    }
+
+@dataclass(slots=True)
 class AchievementSystem:
-    def __init__(self):
-        self.achievements = {
-            "first_ingestion": {"name": "أول ابتلاع", "desc": "ابتلاع أول عالم", "unlocked": False},
-            "master_ingester": {"name": "سيد الابتلاع", "desc": "ابتلاع 10 عوالم", "unlocked": False, "count": 0},
-            "ecosystem_balance": {"name": "توازن بيئي", "desc": "الحفاظ على 5 مخلوقات لمدة 10 تيكس", "unlocked": False},
-            "craft_master": {"name": "سيد الصنعة", "desc": "صنع 5 عناصر مختلفة", "unlocked": False, "count": 0},
-            "settlement_founder": {"name": "مؤسس المستوطنة", "desc": "إنشاء أول مستوطنة", "unlocked": False},
-            "skill_master": {"name": "سيد المهارات", "desc": "الوصول لمستوى 10 في 3 مهارات", "unlocked": False},
-            "trade_master": {"name": "سيد التجارة", "desc": "إجراء 50 صفقة تجارية", "unlocked": False, "count": 0},
-            "settlement_ruler": {"name": "حاكم المستوطنات", "desc": "امتلاك 3 مستوطنات", "unlocked": False, "count": 0}
-        }
-    
+    # عتبات الإنجازات التراكمية: مصدر الحقيقة الوحيد بدل سلسلة elif
+    _THRESHOLDS = {
+        "master_ingester": 10,
+        "trade_master": 50,
+        "craft_master": 5,
+        "settlement_ruler": 3
+    }
+
+    achievements: Dict[str, Dict[str, Any]] = field(default_factory=_default_achievements)
+
+
     def check_achievement(self, achievement_id: str, progress: int = 1) -> bool:
         if achievement_id in self.achievements:
             achievement = self.achievements[achievement_id]
             if not achievement["unlocked"]:
                 if "count" in achievement:
                     achievement["count"] += progress
-                    if achievement_id == "master_ingester" and achievement["count"] >= 10:
-                        achievement["unlocked"] = True
-                        return True
-                    elif achievement_id == "trade_master" and achievement["count"] >= 50:
-                        achievement["unlocked"] = True
-                        return True
-                    elif achievement_id == "craft_master" and achievement["count"] >= 5:
-                        achievement["unlocked"] = True
-                        return True
-                    elif achievement_id == "settlement_ruler" and achievement["count"] >= 3:
+                    threshold = self._THRESHOLDS.get(achievement_id)
+                    if threshold is not None and achievement["count"] >= threshold:
                         achievement["unlocked"] = True
                         return True
                 else:
@@ -181,6 +355,22 @@ class AchievementSystem:
 # ---------------------------
 # نظام المهارات المحسن
 # ---------------------------
+# مستويات التأثيرات كأعداد صحيحة مرتبة، تحسب مرة واحدة عند التحميل
+# لكل مهارة: (قائمة المستويات للبحث الثنائي، قائمة (مستوى، تأثيرات))
+_SKILL_EFFECT_LEVELS: Dict[str, Tuple[List[int], List[Tuple[int, dict]]]] = {}
+for _skill, _skill_data in SKILL_EFFECTS.items():
+    _entries = sorted((int(lvl), data) for lvl, data in _skill_data.get("effects", {}).items())
+    _SKILL_EFFECT_LEVELS[_skill] = ([lvl for lvl, _ in _entries], _entries)
+
+@functools.lru_cache(maxsize=512)
+def _skill_effect(skill_name: str, level: int) -> Dict[str, float]:
+    """العثور على التأثير المناسب للمستوى (القاموس المعاد مشترك؛ لا تعدله)"""
+    levels, entries = _SKILL_EFFECT_LEVELS.get(skill_name, ((), ()))
+    applicable_effects = {}
+    for _, effect_data in entries[:bisect_right(levels, level)]:
+        applicable_effects.update(effect_data)
+    return applicable_effects
+
 class SkillSystem:
     def __init__(self):
         self.skill_xp_values = {
@@ -188,19 +378,10 @@ class SkillSystem:
             "fight": 10.0, "build": 7.0, "trade": 6.0,
             "plant": 4.0, "harvest": 3.0, "work": 2.0
         }
-    
+
     def get_skill_effect(self, skill_name: str, level: int) -> Dict[str, float]:
-        """الحصول على تأثير المهارة بناء على المستوى من game_data.json"""
-        skill_data = SKILL_EFFECTS.get(skill_name, {})
-        effects = skill_data.get("effects", {})
-        
-        # العثور على التأثير المناسب للمستوى
-        applicable_effects = {}
-        for effect_level, effect_data in effects.items():
-            if level >= int(effect_level):
-                applicable_effects.update(effect_data)
-        
-        return applicable_effects
+        """الحصول على تأثير المهارة بناء على المستوى من game_data.json (قراءة فقط)"""
+        return _skill_effect(skill_name, level)
     
     def gain_skill_xp(self, skill_name: str, action_type: str, magnitude: float = 1.0) -> float:
         """اكتساب خبرة المهارة بناء على نوع العمل"""
@@ -211,7 +392,8 @@ class SkillSystem:
 # نظام المهن المحسن
 # ---------------------------
 class ProfessionSystem:
-    def can_assign_profession(self, human_type: str, profession: str) -> bool:
+    @staticmethod
+    def can_assign_profession(human_type: str, profession: str) -> bool:
         """التحقق من إمكانية تعيين المهنة للإنسان"""
         human_data = HUMANS.get(human_type, {})
         profession_data = PROFESSIONS.get(profession, {})
@@ -229,46 +411,35 @@ class ProfessionSystem:
         
         return True
     
-    def get_available_professions(self, human_type: str) -> List[str]:
+    @staticmethod
+    def get_available_professions(human_type: str) -> List[str]:
         """الحصول على المهن المتاحة لنوع الإنسان"""
         available = []
         for profession_id, profession_data in PROFESSIONS.items():
-            if self.can_assign_profession(human_type, profession_id):
+            if ProfessionSystem.can_assign_profession(human_type, profession_id):
                 available.append(profession_id)
         return available
-    
-    def get_profession_requirements(self, profession: str) -> Dict[str, int]:
+
+    @staticmethod
+    def get_profession_requirements(profession: str) -> Dict[str, int]:
         """الحصول على متطلبات المهنة"""
         profession_data = PROFESSIONS.get(profession, {})
         return profession_data.get("required_skills", {})
     
-    def get_profession_production(self, profession: str, count: int) -> Dict[str, int]:
+    @staticmethod
+    def get_profession_production(profession: str, count: int) -> Dict[str, int]:
         """الحصول على إنتاج المهنة"""
-        profession_data = PROFESSIONS.get(profession, {})
-        production = profession_data.get("production", {})
-        
-        result = {}
-        for item, amount in production.items():
-            # تحويل القيمة إلى عدد صحيح إذا كانت نصاً
-            amount_int = int(amount) if isinstance(amount, str) else amount
-            result[item] = amount_int * count
-        
-        return result
+        production = PROFESSIONS.get(profession, {}).get("production", {})
+        return {item: amount * count for item, amount in production.items()}
     
-    def get_profession_bonuses(self, profession: str, count: int) -> Dict[str, float]:
+    @staticmethod
+    def get_profession_bonuses(profession: str, count: int) -> Dict[str, float]:
         """الحصول على مكافآت المهنة"""
-        profession_data = PROFESSIONS.get(profession, {})
-        bonuses = profession_data.get("bonuses", {})
-        
-        result = {}
-        for bonus, value in bonuses.items():
-            # تحويل القيمة إلى عدد عشري إذا كانت نصاً
-            value_float = float(value) if isinstance(value, str) else value
-            result[bonus] = value_float * count
-        
-        return result
+        bonuses = PROFESSIONS.get(profession, {}).get("bonuses", {})
+        return {bonus: value * count for bonus, value in bonuses.items()}
     
-    def calculate_productivity(self, profession: str, skill_levels: Dict[str, int]) -> float:
+    @staticmethod
+    def calculate_productivity(profession: str, skill_levels: Dict[str, int]) -> float:
         """حساب إنتاجية المهنة بناء على مهارات الإنسان"""
         profession_data = PROFESSIONS.get(profession, {})
         base_productivity = profession_data.get("base_productivity", 1.0)
@@ -281,6 +452,10 @@ class ProfessionSystem:
         
         return base_productivity * skill_bonus
 
+# نسخ وحيدة للأنظمة عديمة الحالة بدل إنشائها في كل استدعاء
+SKILL_SYSTEM = SkillSystem()
+PROFESSION_SYSTEM = ProfessionSystem()
+
 # ---------------------------
 # نظام الاقتصاد المحسن
 # ---------------------------
@@ -297,17 +472,31 @@ class RealEconomy:
         }
         self.player_wealth = {"spirit_coins": 200}
         self.market_demand = {}
-        self.transaction_history = []
+        # سجل محدود الطول: الإضافة O(1) مع طرد أقدم الصفقات تلقائياً
+        self.transaction_history = deque(maxlen=CONFIG.get("MAX_TRANSACTIONS", 1000))
         self.trade_count = 0
-        
+        self.rng = random.Random(RANDOM_SEED)
+        self._rebuild_price_factors()
+
+    def _rebuild_price_factors(self):
+        """حساب الجزء الثابت من معادلة السعر (القاعدة × الندرة) مرة واحدة"""
+        self._price_factors = {
+            item_id: base * (2 - get_rarity(item_id))
+            for item_id, base in self.base_prices.items()
+        }
+        # صف مفاتيح ثابت لأحداث السوق العشوائية
+        self._price_items = tuple(self.base_prices)
+
     def calculate_price(self, item_id: str, quantity: int = 1, is_buying: bool = True) -> float:
         """حساب السعر مع مراعاة العرض والطلب"""
-        base_price = self.base_prices.get(item_id, 1)
+        factor = self._price_factors.get(item_id)
+        if factor is None:
+            factor = self.base_prices.get(item_id, 1) * (2 - get_rarity(item_id))
+            self._price_factors[item_id] = factor
         demand = self.market_demand.get(item_id, 1.0)
-        rarity = get_rarity(item_id)
-        
+
         # سعر ديناميكي based على الندرة والطلب والكمية
-        price = base_price * demand * (2 - rarity) * (0.9 + quantity * 0.01)
+        price = factor * demand * (0.9 + quantity * 0.01)
         
         # تعديل السعر حسب نوع العملية (شراء/بيع)
         if not is_buying:
@@ -330,15 +519,17 @@ class RealEconomy:
     
     def update_market(self):
         """تحديد السوق بناء على عوامل مختلفة"""
-        for item_id in self.base_prices.keys():
-            # تقليل الطلب تدريجياً مع الوقت
-            current_demand = self.market_demand.get(item_id, 1.0)
-            self.market_demand[item_id] = max(0.5, current_demand * 0.99)
+        # تقليل الطلب تدريجياً مع الوقت في تمريرة واحدة
+        get_demand = self.market_demand.get
+        self.market_demand = {
+            item_id: max(0.5, get_demand(item_id, 1.0) * 0.99)
+            for item_id in self.base_prices
+        }
         
         # أحداث عشوائية تؤثر على السوق
-        if random.random() < 0.1:
-            affected_item = random.choice(list(self.base_prices.keys()))
-            change = random.uniform(0.8, 1.2)
+        if self.rng.random() < 0.1:
+            affected_item = self.rng.choice(self._price_items)
+            change = self.rng.uniform(0.8, 1.2)
             self.market_demand[affected_item] = max(0.5, min(2.0, 
                 self.market_demand.get(affected_item, 1.0) * change))
     
@@ -347,7 +538,7 @@ class RealEconomy:
         output = ["📊 حالة السوق:"]
         for item_id, demand in sorted(self.market_demand.items(), 
                                     key=lambda x: x[1], reverse=True)[:10]:
-            item_name = BLOCKS.get(item_id, {}).get('name', item_id)
+            item_name = block_name(item_id)
             base_price = self.base_prices.get(item_id, 1)
             current_price = self.calculate_price(item_id, 1, True)
             output.append(f"{item_name}: الطلب {demand:.2f} × السعر {current_price:.1f} (قاعدة: {base_price})")
@@ -360,8 +551,7 @@ class RealEconomy:
         total_cost = price * quantity
         
         # تطبيق تأثير مهارة التجارة
-        skill_system = SkillSystem()
-        skill_effect = skill_system.get_skill_effect("trading", trading_skill)
+        skill_effect = SKILL_SYSTEM.get_skill_effect("trading", trading_skill)
         price_modifier = skill_effect.get("price_advantage", 1.0)
         total_cost = int(total_cost * price_modifier)
         
@@ -389,7 +579,7 @@ class RealEconomy:
         return {
             "base_prices": self.base_prices,
             "market_demand": self.market_demand,
-            "transaction_history": self.transaction_history,
+            "transaction_history": list(self.transaction_history),
             "player_wealth": self.player_wealth,
             "trade_count": self.trade_count
         }
@@ -399,8 +589,12 @@ class RealEconomy:
         economy = RealEconomy()
         if data:
             economy.base_prices = data.get("base_prices", economy.base_prices)
+            economy._rebuild_price_factors()
             economy.market_demand = data.get("market_demand", {})
-            economy.transaction_history = data.get("transaction_history", [])
+            economy.transaction_history = deque(
+                data.get("transaction_history", []),
+                maxlen=CONFIG.get("MAX_TRANSACTIONS", 1000)
+            )
             economy.player_wealth = data.get("player_wealth", {"spirit_coins": 100})
             economy.trade_count = data.get("trade_count", 0)
         return economy
@@ -408,12 +602,12 @@ class RealEconomy:
 # ---------------------------
 # نظام التأثيرات الخاصة
 # ---------------------------
+@dataclass(slots=True)
 class EffectSystem:
-    def __init__(self):
-        self.temporary_effects = {}
-        self.permanent_effects = {}
-        self.active_buffs = {}
-        
+    temporary_effects: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    permanent_effects: Dict[str, float] = field(default_factory=dict)
+    active_buffs: Dict[str, Any] = field(default_factory=dict)
+
     def apply_effect(self, effect_type: str, duration: float, value: float, source: str = ""):
         if duration <= 0:  # تأثير دائم
             self.permanent_effects[effect_type] = value
@@ -428,15 +622,13 @@ class EffectSystem:
             return f"تأثير {effect_type} مؤقت مضاف لمدة {duration:.1f} ثانية!"
     
     def update_effects(self):
+        # إعادة بناء القاموس في تمريرة واحدة بدل جمع المنتهي ثم حذفه
         current_time = time.time()
-        expired_effects = []
-        
-        for effect_type, effect_data in self.temporary_effects.items():
-            if current_time >= effect_data["expires"]:
-                expired_effects.append(effect_type)
-        
-        for effect in expired_effects:
-            del self.temporary_effects[effect]
+        self.temporary_effects = {
+            effect_type: effect_data
+            for effect_type, effect_data in self.temporary_effects.items()
+            if effect_data["expires"] > current_time
+        }
     
     def get_effect_value(self, effect_type: str) -> float:
         # الجمع بين التأثيرات الدائمة والمؤقتة
@@ -466,28 +658,30 @@ class EffectSystem:
                     output.append(f"  {effect_name}: {data['value']} (متبقي: {int(time_left)}s)")
         
         return "\n".join(output) if len(output) > 1 else "لا توجد تأثيرات نشطة"
-    
+
+    # يبنى مرة واحدة على مستوى الصنف بدل إعادة البناء في كل استدعاء
+    _EFFECT_NAMES = {
+        "ingestion_capacity": "سعة الابتلاع",
+        "xp_gain": "زيادة الخبرة",
+        "qi_generation": "توليد الطاقة",
+        "plant_growth_boost": "تعزيز نمو النباتات",
+        "attack_bonus": "تعزيز الهجوم",
+        "defense_bonus": "تعزيز الدفاع",
+        "crafting_speed": "سرعة الصنعة",
+        "price_advantage": "ميزة السعر",
+        "food_production": "إنتاج الغذاء",
+        "population_capacity": "سعة السكان",
+        "comfort": "الراحة",
+        "spirit_attraction": "جذب الأرواح",
+        "storage_capacity": "سعة التخزين",
+        "item_preservation": "الحفاظ على العناصر",
+        "trading_efficiency": "كفاءة التجارة",
+        "training_speed": "سرعة التدريب"
+    }
+
     def _get_effect_name(self, effect_key: str) -> str:
         """ترجمة مفاتيح التأثيرات إلى أسماء عربية"""
-        effect_names = {
-            "ingestion_capacity": "سعة الابتلاع",
-            "xp_gain": "زيادة الخبرة",
-            "qi_generation": "توليد الطاقة",
-            "plant_growth_boost": "تعزيز نمو النباتات",
-            "attack_bonus": "تعزيز الهجوم",
-            "defense_bonus": "تعزيز الدفاع",
-            "crafting_speed": "سرعة الصنعة",
-            "price_advantage": "ميزة السعر",
-            "food_production": "إنتاج الغذاء",
-            "population_capacity": "سعة السكان",
-            "comfort": "الراحة",
-            "spirit_attraction": "جذب الأرواح",
-            "storage_capacity": "سعة التخزين",
-            "item_preservation": "الحفاظ على العناصر",
-            "trading_efficiency": "كفاءة التجارة",
-            "training_speed": "سرعة التدريب"
-        }
-        return effect_names.get(effect_key, effect_key)
+        return self._EFFECT_NAMES.get(effect_key, effect_key)
     
     def to_dict(self):
         return {
@@ -508,18 +702,29 @@ class EffectSystem:
 # ---------------------------
 # نظام البناء والهياكل
 # ---------------------------
+# تكاليف وتأثيرات المباني كصفوف جاهزة، تبنى مرة واحدة عند التحميل
+# التكاليف مرتبة تنازلياً ليفشل الفحص على أغلى مورد مبكراً
+_BUILDING_COSTS = {
+    bid: tuple(sorted(bd.get("cost", {}).items(), key=lambda kv: -kv[1]))
+    for bid, bd in BUILDINGS.items()
+}
+_BUILDING_EFFECTS = {bid: tuple(bd.get("effects", {}).items()) for bid, bd in BUILDINGS.items()}
+
+@dataclass(slots=True)
 class BuildingSystem:
-    def __init__(self):
-        self.buildings = {}
-        self.construction_queue = []
-        self.last_construction_time = time.time()
-        
+    buildings: Dict[str, int] = field(default_factory=dict)
+    construction_queue: List[Any] = field(default_factory=list)
+    last_construction_time: float = field(default_factory=time.time)
+
     def can_build(self, building_id: str, resources: Dict[str, int]) -> bool:
-        if building_id not in BUILDINGS:
+        building_cost = _BUILDING_COSTS.get(building_id)
+        if building_cost is None:
             return False
-        
-        building_cost = BUILDINGS[building_id].get("cost", {})
-        return all(resources.get(res, 0) >= amount for res, amount in building_cost.items())
+
+        for res, amount in building_cost:
+            if resources.get(res, 0) < amount:
+                return False
+        return True
     
     def get_available_buildings(self, resources: Dict[str, int]) -> List[str]:
         """الحصول على المباني المتاحة بناء على الموارد"""
@@ -541,7 +746,7 @@ class BuildingSystem:
         output = [f"🏗️ {building_data.get('name', building_id)}:"]
         output.append("التكلفة:")
         for resource, amount in cost.items():
-            resource_name = BLOCKS.get(resource, {}).get('name', resource)
+            resource_name = block_name(resource)
             output.append(f"  {resource_name}: {amount}")
         
         output.append("التأثيرات:")
@@ -550,26 +755,28 @@ class BuildingSystem:
             output.append(f"  {effect_name}: {value}")
         
         return "\n".join(output)
-    
+
+    # يبنى مرة واحدة على مستوى الصنف بدل إعادة البناء في كل استدعاء
+    _EFFECT_NAMES = {
+        "food_production": "إنتاج الغذاء",
+        "plant_growth_boost": "تعزيز نمو النباتات",
+        "population_capacity": "سعة السكان",
+        "comfort": "الراحة",
+        "crafting_speed": "سرعة الصنعة",
+        "crafting_quality": "جودة الصنعة",
+        "qi_generation": "توليد الطاقة",
+        "spirit_attraction": "جذب الأرواح",
+        "storage_capacity": "سعة التخزين",
+        "item_preservation": "الحفاظ على العناصر",
+        "trading_efficiency": "كفاءة التجارة",
+        "defense_bonus": "تعزيز الدفاع",
+        "training_speed": "سرعة التدريب",
+        "price_advantage": "ميزة السعر"
+    }
+
     def _get_effect_name(self, effect_key: str) -> str:
         """ترجمة مفاتيح التأثيرات إلى أسماء عربية"""
-        effect_names = {
-            "food_production": "إنتاج الغذاء",
-            "plant_growth_boost": "تعزيز نمو النباتات",
-            "population_capacity": "سعة السكان",
-            "comfort": "الراحة",
-            "crafting_speed": "سرعة الصنعة",
-            "crafting_quality": "جودة الصنعة",
-            "qi_generation": "توليد الطاقة",
-            "spirit_attraction": "جذب الأرواح",
-            "storage_capacity": "سعة التخزين",
-            "item_preservation": "الحفاظ على العناصر",
-            "trading_efficiency": "كفاءة التجارة",
-            "defense_bonus": "تعزيز الدفاع",
-            "training_speed": "سرعة التدريب",
-            "price_advantage": "ميزة السعر"
-        }
-        return effect_names.get(effect_key, effect_key)
+        return self._EFFECT_NAMES.get(effect_key, effect_key)
     
     def construct_building(self, building_id: str, resources: Dict[str, int]) -> str:
         if not self.can_build(building_id, resources):
@@ -589,10 +796,8 @@ class BuildingSystem:
     def get_building_effects(self) -> Dict[str, float]:
         effects = {}
         for building_id, count in self.buildings.items():
-            if building_id in BUILDINGS:
-                building_effects = BUILDINGS[building_id].get("effects", {})
-                for effect, value in building_effects.items():
-                    effects[effect] = effects.get(effect, 0) + value * count
+            for effect, value in _BUILDING_EFFECTS.get(building_id, ()):
+                effects[effect] = effects.get(effect, 0) + value * count
         return effects
     
     def to_dict(self):
@@ -614,19 +819,34 @@ class BuildingSystem:
 # ---------------------------
 # نظام المستوطنات البشرية المحسن
 # ---------------------------
+@dataclass(slots=True)
 class HumanSettlement:
-    def __init__(self, name: str, population: int = 50):
-        self.name = name
-        self.population = population
-        self.resources = {"food": 1000, "wood": 500, "stone": 300, "herb_common": 200}
-        self.buildings = {"house": 10, "farm": 10, "workshop": 5}
-        self.professions = {"farmer": 20, "woodcutter": 5, "miner": 5}
-        self.culture_level = 1
-        self.technology_level = 1
-        self.last_development = time.time()
-        self.defense = 1
-        self.happiness = 100  # مستوى السعادة من 0-100
-        
+    name: str
+    population: int = 50
+    resources: Dict[str, int] = field(default_factory=lambda: {
+        "food": 1000, "wood": 500, "stone": 300, "herb_common": 200})
+    buildings: Dict[str, int] = field(default_factory=lambda: {
+        "house": 10, "farm": 10, "workshop": 5})
+    professions: Dict[str, int] = field(default_factory=lambda: {
+        "farmer": 20, "woodcutter": 5, "miner": 5})
+    culture_level: float = 1
+    technology_level: float = 1
+    last_development: float = field(default_factory=time.time)
+    defense: int = 1
+    happiness: int = 100  # مستوى السعادة من 0-100
+    # مولد عشوائي خاص بالمستوطنة بدل المولد العام المشترك بين الخيوط
+    rng: Optional[random.Random] = field(default=None, repr=False, compare=False)
+    # إجمالي السكان المعينين في مهن، يحدث تزايدياً بدل جمعه في كل تعيين
+    _assigned_total: int = field(default=0, repr=False, compare=False)
+    # ذاكرة إنتاج المهن: تبطل تلقائيًا عند تغير توزيعة المهن
+    _prod_cache: Optional[Dict[str, int]] = field(default=None, repr=False, compare=False)
+    _prod_cache_key: Any = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.rng is None:
+            self.rng = random.Random(hash(self.name) ^ RANDOM_SEED)
+        self._assigned_total = sum(self.professions.values())
+
     def to_dict(self):
         return {
             "name": self.name,
@@ -648,6 +868,7 @@ class HumanSettlement:
         settlement.resources = data.get("resources", {"food": 100, "wood": 50, "stone": 30})
         settlement.buildings = data.get("buildings", {"house": 10, "farm": 10,"workshop":5})
         settlement.professions = data.get("professions", {})
+        settlement._assigned_total = sum(settlement.professions.values())
         settlement.culture_level = data.get("culture_level", 1)
         settlement.technology_level = data.get("technology_level", 1)
         settlement.last_development = data.get("last_development", time.time())
@@ -657,32 +878,30 @@ class HumanSettlement:
     
     def get_info(self) -> str:
         """الحصول على معلومات كاملة عن المستوطنة"""
-        output = [
-            f"🏘️ مستوطنة {self.name}:",
-            f":{self.buildings} مبانى",
-            f"👥 السكان: {self.population}",
-            f"😊 السعادة: {self.happiness}/100",
-            f"🛡️ الدفاع: {self.defense}",
-            f"📚 الثقافة: {self.culture_level:.1f}",
+        header = (
+            f"🏘️ مستوطنة {self.name}:\n"
+            f":{self.buildings} مبانى\n"
+            f"👥 السكان: {self.population}\n"
+            f"😊 السعادة: {self.happiness}/100\n"
+            f"🛡️ الدفاع: {self.defense}\n"
+            f"📚 الثقافة: {self.culture_level:.1f}\n"
             f"🔬 التكنولوجيا: {self.technology_level:.1f}"
-        ]
-        
-        output.append("🏗️ المباني:")
-        for building, count in self.buildings.items():
-            building_name = BUILDINGS.get(building, {}).get('name', building)
-            output.append(f"  {building_name}: {count}")
-        
-        output.append("👨‍🌾 المهن:")
-        for profession, count in self.professions.items():
-            profession_name = PROFESSIONS.get(profession, {}).get('name', profession)
-            output.append(f"  {profession_name}: {count}")
-        
-        output.append("📦 الموارد:")
-        for resource, amount in self.resources.items():
-            resource_name = BLOCKS.get(resource, {}).get('name', resource)
-            output.append(f"  {resource_name}: {amount}")
-        
-        return "\n".join(output)
+        )
+        buildings = "\n".join(
+            f"  {BUILDINGS.get(building, {}).get('name', building)}: {count}"
+            for building, count in self.buildings.items()
+        )
+        professions = "\n".join(
+            f"  {PROFESSIONS.get(profession, {}).get('name', profession)}: {count}"
+            for profession, count in self.professions.items()
+        )
+        resources = "\n".join(
+            f"  {block_name(resource)}: {amount}"
+            for resource, amount in self.resources.items()
+        )
+        return "\n".join([header, "🏗️ المباني:", buildings,
+                          "👨‍🌾 المهن:", professions,
+                          "📦 الموارد:", resources])
     
     def update_settlement(self, current_time: float):
         """تحديث المستوطنة بشكل كامل"""
@@ -696,32 +915,35 @@ class HumanSettlement:
         
         # حساب عدد التيكات التي مرت
         ticks_passed = int(time_diff / 36)
-        
+
+        # تجهيز الثوابت عبر الدفعة كاملة مرة واحدة بدل كل تيك
+        production_rows = [
+            (item, amount * count)
+            for profession, count in self.professions.items()
+            for item, amount in PROFESSIONS.get(profession, {}).get("production", {}).items()
+        ]
+        max_population = self.buildings.get("house", 0) * 5
+
         for _ in range(ticks_passed):
-            self._develop_tick()
-        
+            self._develop_tick(production_rows, max_population)
+
         self.last_development = current_time
-    
-    def _develop_tick(self):
+
+    def _develop_tick(self, production_rows: List[Tuple[str, int]], max_population: int):
         """تطوير المستوطنة في تيك واحد"""
         # زيادة السكان based على المساكن
-        max_population = self.buildings.get("house", 0) * 5
         if self.population < max_population and self.resources.get("food", 0) > 30:
             growth_chance = 0.3 + (self.culture_level * 0.1)
-            if random.random() < growth_chance:
+            if self.rng.random() < growth_chance:
                 self.population += 1
                 self.resources["food"] -= 1
-        
-        # إنتاج الموارد من المهن
-        profession_system = ProfessionSystem()
-        for profession, count in self.professions.items():
-            prof_production = profession_system.get_profession_production(profession, count)
-            for item, amount in prof_production.items():
-                self.resources[item] = self.resources.get(item, 0) + amount
-        
-        # استهلاك الغذاء
-        food_consumption = self.population * 0.5
-        self.resources["food"] = max(0, self.resources.get("food", 0) - food_consumption)
+
+        # إنتاج الموارد من المهن واستهلاك الغذاء في تمريرة واحدة
+        resources = self.resources
+        for item, amount in production_rows:
+            resources[item] = resources.get(item, 0) + amount
+
+        resources["food"] = max(0, resources.get("food", 0) - self.population * 0.5)
         
         # تطوير ثقافي وتكنولوجي
         if self.resources.get("food", 0) > 80:
@@ -730,23 +952,31 @@ class HumanSettlement:
     
     def assign_profession(self, profession: str, count: int) -> str:
         """تعيين مهنة للسكان"""
-        available_population = self.population - sum(self.professions.values())
-        if count > available_population:
+        if count > self.population - self._assigned_total:
             return "لا يوجد عدد كافي من السكان المتاحين."
-        
+
         self.professions[profession] = self.professions.get(profession, 0) + count
+        self._assigned_total += count
         return f"تم تعيين {count} سكان كمهنة {profession}"
     
     def get_production(self) -> Dict[str, int]:
-        """الحصول على إنتاج المستوطنة بناء على المهن"""
+        """الحصول على إنتاج المستوطنة بناء على المهن
+
+        الناتج حتمي لتوزيعة المهن، فيعاد المحسوب سابقًا ما لم تتغير.
+        القاموس المعاد مشترك؛ لا تعدله.
+        """
+        key = tuple(sorted(self.professions.items()))
+        if key == self._prod_cache_key:
+            return self._prod_cache
+
         production = {}
-        profession_system = ProfessionSystem()
-        
         for profession, count in self.professions.items():
-            prof_production = profession_system.get_profession_production(profession, count)
+            prof_production = PROFESSION_SYSTEM.get_profession_production(profession, count)
             for item, amount in prof_production.items():
                 production[item] = production.get(item, 0) + amount
-        
+
+        self._prod_cache = production
+        self._prod_cache_key = key
         return production
     
     def collect_resources(self, resource: str = None, amount: int = None) -> Dict[str, int]:
@@ -761,19 +991,19 @@ class HumanSettlement:
                 self.resources[resource] -= take
                 collected[resource] = take
         else:
-            # جمع جزء من جميع الموارد (ضريبة)
-            for res, amt in self.resources.items():
-                if amt > 10:  # فقط إذا كان هناك كمية كافية
-                    take = int(amt * 0.1)  # 10% ضريبة
-                    self.resources[res] -= take
-                    collected[res] = take
-        
+            # جمع جزء من جميع الموارد (ضريبة 10%): حساب الاقتطاعات أولاً ثم تطبيقها دفعة واحدة
+            collected = {res: int(amt * 0.1) for res, amt in self.resources.items() if amt > 10}
+            for res, take in collected.items():
+                self.resources[res] -= take
+
         return collected
 
 # ---------------------------
 # Dataclasses
 # ---------------------------
-@dataclass
+# slots=True: آلاف المخلوقات تعيش في الذاكرة معًا، والتخطيط المضغوط يوفر
+# قاموس الكائن ويسرع قراءة السمات في حلقات المحاكاة
+@dataclass(slots=True)
 class CreatureInstance:
     uid: str
     spec_id: str
@@ -800,19 +1030,35 @@ class CreatureInstance:
 
     @staticmethod
     def from_dict(d):
+        now = time.time()  # قراءة واحدة للساعة تكفي للحقلين
         creature = CreatureInstance(
-            d["uid"], 
-            d["spec_id"], 
-            d.get("energy", 0.0), 
-            d.get("age", 0)
+            d["uid"],
+            sys.intern(d["spec_id"]),
+            d.get("energy", 0.0),
+            d.get("age", 0),
+            d.get("last_breed", now),
+            d.get("last_access", now)
         )
-        creature.last_breed = d.get("last_breed", time.time())
-        creature.last_access = d.get("last_access", time.time())
         creature.summoned = d.get("summoned", False)
         creature.summon_expires = d.get("summon_expires", 0)
         creature.level_boost = d.get("level_boost", 0)
         return creature
 
+    def as_row(self, world_id: str) -> tuple:
+        """صف جاهز للإدراج في جدول creatures بلا قاموس وسيط"""
+        return (self.uid, world_id, self.spec_id, self.energy, self.age,
+                self.last_breed, self.last_access, int(self.summoned),
+                self.summon_expires, self.level_boost)
+
+    @staticmethod
+    def from_row(row) -> "CreatureInstance":
+        """بناء مباشر من صف قاعدة البيانات بلا مرور عبر dict.get"""
+        return CreatureInstance(
+            row["uid"], sys.intern(row["spec_id"]), row["energy"], row["age"],
+            row["last_breed"], row["last_access"], bool(row["summoned"]),
+            row["summon_expires"], row["level_boost"]
+        )
+
 @dataclass
 class World:
     id: str
@@ -821,7 +1067,8 @@ class World:
     size_cubes: int
     difficulty: float
     biome: str
-    elements: Dict[str, int] = field(default_factory=dict)
+    # Counter: الزيادة على مفتاح غائب تعمل مباشرة بلا d.get(k,0) المزدوج
+    elements: Dict[str, int] = field(default_factory=Counter)
     creatures: List[CreatureInstance] = field(default_factory=list)
     last_tick: float = field(default_factory=time.time)
     carrying_capacity: int = 0
@@ -832,11 +1079,32 @@ class World:
     settlements: List[HumanSettlement] = field(default_factory=list)
     economy: RealEconomy = field(default_factory=RealEconomy)
 
-    def to_dict(self):
+    def __post_init__(self):
+        # الاسم المطبّع يحسب مرة واحدة بدل إعادة التطبيع عند كل resolve_world
+        self._name_norm = normalize_ar_text(self.name)
+        self._uid_cache: Dict[str, CreatureInstance] = {}
+        self._uid_cache_key = (-1, -1)
+        self._creatures_version = 0
+
+    def get_creature(self, uid: str) -> Optional[CreatureInstance]:
+        """بحث O(1) بالمعرف؛ الفهرس يعاد بناؤه كسولًا عند تغير قائمة المخلوقات.
+
+        المفتاح (إصدار، طول): الطول يلتقط الإضافة والحذف في المكان، وعدّاد
+        الإصدار يُرفع عند كل استبدال للقائمة — الاعتماد على id() خطر لأن
+        قائمة جديدة قد ترث عنوان قائمة محررة بنفس الطول فيُقرأ فهرس قديم.
+        """
+        key = (self._creatures_version, len(self.creatures))
+        if key != self._uid_cache_key:
+            self._uid_cache = {c.uid: c for c in self.creatures}
+            self._uid_cache_key = key
+        return self._uid_cache.get(uid)
+
+    def to_meta_dict(self):
+        """حقول العالم دون العناصر والمخلوقات: ما يذهب إلى عمود JSON في
+        القاعدة، حيث تحفظ العناصر والمخلوقات كصفوف مطبعة منفصلة"""
         return {
             "id": self.id, "name": self.name, "seed": self.seed, "size_cubes": self.size_cubes,
             "difficulty": self.difficulty, "biome": self.biome, "explored": self.explored,
-            "elements": self.elements, "creatures": [c.to_dict() for c in self.creatures],
             "last_tick": self.last_tick, "carrying_capacity": self.carrying_capacity,
             "regen_rate_scalar": self.regen_rate_scalar, "description": self.description,
             "last_access": self.last_access,
@@ -844,20 +1112,27 @@ class World:
             "economy": self.economy.to_dict()
         }
 
+    def to_dict(self):
+        d = self.to_meta_dict()
+        d["elements"] = self.elements
+        d["creatures"] = [c.to_dict() for c in self.creatures]
+        return d
+
     @staticmethod
     def from_dict(d):
         w = World(
             d["id"], d["name"], d["seed"], d["size_cubes"], 
             d["difficulty"], d.get("biome", "generic")
         )
-        w.elements = d.get("elements", {})
+        now = time.time()
+        w.elements = Counter(d.get("elements", {}))
         w.creatures = [CreatureInstance.from_dict(cd) for cd in d.get("creatures", [])]
-        w.last_tick = d.get("last_tick", time.time())
+        w.last_tick = d.get("last_tick", now)
         w.carrying_capacity = d.get("carrying_capacity", w.size_cubes // 10)
         w.regen_rate_scalar = d.get("regen_rate_scalar", 1.0)
         w.description = d.get("description", "")
         w.explored = d.get("explored", False)
-        w.last_access = d.get("last_access", time.time())
+        w.last_access = d.get("last_access", now)
         w.settlements = [HumanSettlement.from_dict(sd) for sd in d.get("settlements", [])]
         w.economy = RealEconomy.from_dict(d.get("economy", {}))
         return w
@@ -880,7 +1155,7 @@ class WorldGenerator:
         min_s, max_s = tier_map[size_tier]
         size = rnd.randint(min_s, max_s)
         
-        biome_key = rnd.choice(list(BIOMES.keys()))
+        biome_key = rnd.choice(_BIOME_KEYS)
         biome_data = BIOMES[biome_key]
         biome_name = biome_data["name"]
         
@@ -896,32 +1171,32 @@ class WorldGenerator:
             
         w.description = f"عالم نمط {biome_name}, حجم {size}, صعوبة {difficulty}"
 
-        # توليد العناصر بناء على أوزان البايمز
-        block_ids = list(biome_data["block_weights"].keys())
-        block_weights = list(biome_data["block_weights"].values())
-        
-        total_weight = sum(block_weights)
-        for block_id, weight in zip(block_ids, block_weights):
-            count = max(1, int(size * weight / total_weight * rnd.uniform(0.8, 1.2)))
-            w.elements[block_id] = w.elements.get(block_id, 0) + count
+        # توليد العناصر بناء على أوزان البايمز (احتمالات مطبّعة مسبقًا)
+        block_ids, block_probs = _BIOME_BLOCK_DIST[biome_key]
+        w.elements = Counter({block_id: max(1, int(size * prob * rnd.uniform(0.8, 1.2)))
+                              for block_id, prob in zip(block_ids, block_probs)})
 
-        # توليد المخلوقات
+        # توليد المخلوقات (الثوابت المعتمدة على الحجم تحسب مرة واحدة خارج الحلقة)
         creature_count = 0
         max_creatures = min(CONFIG["MAX_CREATURES_PER_WORLD"], size // 20)
-        
+        default_min = 1 if size > 500 else 0
+        big_world = size > 800
+        density = size * 0.015 / w.difficulty
+        now = time.time()
+
         for spec_id, spawn_chance in biome_data["creature_spawns"].items():
-            min_spawn = CONFIG["MIN_CREATURE_SPAWN"] if size > 800 and spawn_chance > 0.2 else 1 if size > 500 else 0
-            
-            base_count = max(min_spawn, int(size * 0.015 * spawn_chance / w.difficulty))
+            min_spawn = CONFIG["MIN_CREATURE_SPAWN"] if big_world and spawn_chance > 0.2 else default_min
+            base_count = max(min_spawn, int(density * spawn_chance))
             count = rnd.randint(min_spawn, min(max_creatures - creature_count, base_count))
-            
+
             if count > 0 and creature_count < max_creatures:
                 spec = CREATURES[spec_id]
+                energy_max = spec["energy_max"]
+                age_cap = int(spec["lifespan"] * 0.2)
                 for _ in range(count):
-                    uid = f"{spec_id}_{uuid.uuid4().hex[:6]}"
-                    energy = spec["energy_max"] * rnd.uniform(0.5, 0.9)
-                    age = rnd.randint(0, int(spec["lifespan"] * 0.2))
-                    inst = CreatureInstance(uid, spec_id, energy, age, time.time() - rnd.randint(0, 3600))
+                    uid = make_creature_uid(spec_id)
+                    inst = CreatureInstance(uid, spec_id, energy_max * rnd.uniform(0.5, 0.9),
+                                            rnd.randint(0, age_cap), now - rnd.randint(0, 3600), now)
                     w.creatures.append(inst)
                     creature_count += 1
         
@@ -938,141 +1213,218 @@ class WorldGenerator:
 # ---------------------------
 class Storage:
     def __init__(self, dbfile=DB_FILE):
+        import sqlite3  # استيراد كسول: لا تدفع كلفته إلا عند فتح قاعدة البيانات
         self.dbfile = dbfile
-        self.conn = sqlite3.connect(dbfile, timeout=30, check_same_thread=False)
+        self.conn = sqlite3.connect(dbfile, timeout=30, check_same_thread=False,
+                                    cached_statements=512)
         self.conn.row_factory = sqlite3.Row
         self.lock = threading.RLock()
+        # بصمة آخر حفظ للاعب: تتيح تخطي الكتابة حين لا يتغير المحتوى
+        self._last_player_blob: Optional[bytes] = None
+        # اتصالات قراءة لكل خيط: مع WAL يعمل القراء بالتوازي مع الكاتب الواحد
+        self._readers = threading.local()
+        self._configure_db(self.conn)
+        self._init_schema()
+
+    def _reader(self):
+        """اتصال قراءة فقط خاص بالخيط الحالي، ينشأ عند أول طلب"""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.dbfile, timeout=30, check_same_thread=False,
+                                   cached_statements=512)
+            conn.row_factory = sqlite3.Row
+            try:
+                conn.execute("PRAGMA query_only=1;")
+                conn.execute("PRAGMA busy_timeout=5000;")
+            except Exception:
+                pass
+            self._readers.conn = conn
+        return conn
+
+    @staticmethod
+    def _configure_db(conn):
+        """تهيئة الاتصال لتسريع الكتابة الدفعية (WAL بدون fsync لكل إدراج)"""
         try:
-            self.conn.execute("PRAGMA journal_mode=WAL;")
-            self.conn.execute("PRAGMA synchronous=NORMAL;")
-            self.conn.execute("PRAGMA cache_size=-10000;")
+            conn.execute("PRAGMA page_size=8192;")  # قبل إنشاء أي جدول
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("PRAGMA temp_store=MEMORY;")
+            conn.execute("PRAGMA cache_size=-65536;")
+            # قراءة الصفحات عبر mmap بدل syscalls، وتأجيل نقاط فحص WAL
+            conn.execute("PRAGMA mmap_size=268435456;")
+            conn.execute("PRAGMA wal_autocheckpoint=10000;")
         except Exception:
             pass
-        self._init_schema()
 
     def _init_schema(self):
         with self.lock:
             cur = self.conn.cursor()
             cur.execute("""CREATE TABLE IF NOT EXISTS worlds (id TEXT PRIMARY KEY, data_json TEXT)""")
+            cur.execute("""CREATE TABLE IF NOT EXISTS world_elements (world_id TEXT, block_id TEXT, count INTEGER, PRIMARY KEY(world_id, block_id))""")
+            cur.execute("""CREATE TABLE IF NOT EXISTS creatures (uid TEXT PRIMARY KEY, world_id TEXT, spec_id TEXT, energy REAL, age INTEGER, last_breed REAL, last_access REAL, summoned INTEGER, summon_expires REAL, level_boost INTEGER)""")
             cur.execute("""CREATE TABLE IF NOT EXISTS snapshots (key TEXT PRIMARY KEY, source_world TEXT, data_json TEXT, timestamp REAL)""")
             cur.execute("""CREATE TABLE IF NOT EXISTS player (key TEXT PRIMARY KEY, data_json TEXT)""")
             cur.execute("""CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)""")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_creatures_world ON creatures(world_id);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_snap_source ON snapshots(source_world);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_snap_timestamp ON snapshots(timestamp);")
             self.conn.commit()
 
     def save_world(self, w: World, commit: bool = True):
         with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("INSERT OR REPLACE INTO worlds (id, data_json) VALUES (?, ?)",
-                        (w.id, json.dumps(w.to_dict(), ensure_ascii=False)))
-            if commit: self.conn.commit()
+            conn = self.conn
+            # الحقول الوصفية فقط في الـ JSON؛ العناصر والمخلوقات كصفوف مطبعة
+            # تؤخذ من العالم مباشرة دون بناء القاموس الكامل ثم رمي معظمه
+            conn.execute("INSERT OR REPLACE INTO worlds (id, data_json) VALUES (?, ?)",
+                         (w.id, json_dumps(w.to_meta_dict())))
+            conn.execute("DELETE FROM world_elements WHERE world_id=?", (w.id,))
+            conn.executemany(
+                "INSERT INTO world_elements (world_id, block_id, count) VALUES (?,?,?)",
+                # السقف يطبق هنا أيضًا: حفظ قديم قد يحمل أعدادًا تجاوزت int64
+                [(w.id, bid, cnt if cnt <= ELEMENT_MAX else ELEMENT_MAX)
+                 for bid, cnt in w.elements.items()])
+            conn.execute("DELETE FROM creatures WHERE world_id=?", (w.id,))
+            conn.executemany(
+                "INSERT INTO creatures (uid, world_id, spec_id, energy, age, last_breed, "
+                "last_access, summoned, summon_expires, level_boost) VALUES (?,?,?,?,?,?,?,?,?,?)",
+                [c.as_row(w.id) for c in w.creatures])
+            if commit: conn.commit()
 
     def load_world(self, wid: str) -> Optional[World]:
-        with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("SELECT data_json FROM worlds WHERE id=?", (wid,))
-            r = cur.fetchone()
-            if not r: return None
-            try:
-                return World.from_dict(json.loads(r["data_json"]))
-            except Exception:
-                logging.error(f"Failed to load world {wid}")
-                return None
+        rdr = self._reader()
+        r = rdr.execute("SELECT data_json FROM worlds WHERE id=?", (wid,)).fetchone()
+        if not r: return None
+        try:
+            d = json_loads(r["data_json"])
+            if "elements" in d:
+                # حفظ قديم بصيغة blob كاملة
+                return World.from_dict(d)
+
+            d["elements"] = {row["block_id"]: row["count"] for row in rdr.execute(
+                "SELECT block_id, count FROM world_elements WHERE world_id=?", (wid,))}
+            w = World.from_dict(d)
+
+            w.creatures = [CreatureInstance.from_row(row) for row in rdr.execute(
+                "SELECT uid, spec_id, energy, age, last_breed, last_access, "
+                "summoned, summon_expires, level_boost FROM creatures WHERE world_id=?", (wid,))]
+            return w
+        except Exception:
+            _LOG.error("Failed to load world %s", wid)
+            return None
 
     def list_worlds(self) -> List[str]:
-        with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("SELECT id FROM worlds")
-            return [r["id"] for r in cur.fetchall()]
+        return [r["id"] for r in self._reader().execute("SELECT id FROM worlds")]
+
+    def find_creature_world(self, uid: str) -> Optional[str]:
+        """معرف العالم الحاوي للمخلوق عبر المفتاح الأساسي بدل مسح كل العوالم"""
+        r = self._reader().execute("SELECT world_id FROM creatures WHERE uid=?", (uid,)).fetchone()
+        return r["world_id"] if r else None
 
     def delete_world(self, wid: str, commit: bool = True):
         with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("DELETE FROM worlds WHERE id=?", (wid,))
+            self.conn.execute("DELETE FROM worlds WHERE id=?", (wid,))
+            self.conn.execute("DELETE FROM world_elements WHERE world_id=?", (wid,))
+            self.conn.execute("DELETE FROM creatures WHERE world_id=?", (wid,))
             if commit: self.conn.commit()
 
     def save_snapshot(self, key: str, source_world: str, data: dict, commit: bool = True):
         with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("INSERT OR REPLACE INTO snapshots (key, source_world, data_json, timestamp) VALUES (?,?,?,?)",
-                        (key, source_world, json.dumps(data, ensure_ascii=False), time.time()))
+            # اللقطات تخزن مضغوطة: أصغر بكثير في الصفحات وأسرع قراءة
+            # (الحمولات الصغيرة تبقى نصًا؛ الضغط يضخمها ولا يفيد)
+            payload = json_dumps(data)
+            blob = zlib.compress(payload.encode("utf-8"), 3) if len(payload) > 512 else payload
+            self.conn.execute("INSERT OR REPLACE INTO snapshots (key, source_world, data_json, timestamp) VALUES (?,?,?,?)",
+                              (key, source_world, blob, time.time()))
             if commit: self.conn.commit()
 
     def load_snapshot(self, key: str) -> Optional[dict]:
-        with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("SELECT data_json, source_world, timestamp FROM snapshots WHERE key=?", (key,))
-            r = cur.fetchone()
-            if not r: return None
-            return {"key": key, "source_world": r["source_world"], "data": json.loads(r["data_json"]), "timestamp": r["timestamp"]}
+        r = self._reader().execute(
+            "SELECT data_json, source_world, timestamp FROM snapshots WHERE key=?", (key,)).fetchone()
+        if not r: return None
+        raw = r["data_json"]
+        if isinstance(raw, bytes):
+            raw = zlib.decompress(raw)
+        return {"key": key, "source_world": r["source_world"], "data": json_loads(raw), "timestamp": r["timestamp"]}
 
     def list_snapshots(self) -> List[dict]:
-        with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("SELECT key, source_world, timestamp FROM snapshots ORDER BY timestamp DESC")
-            return [{"key": r["key"], "source_world": r["source_world"], "timestamp": r["timestamp"]} for r in cur.fetchall()]
+        cur = self._reader().execute("SELECT key, source_world, timestamp FROM snapshots ORDER BY timestamp DESC")
+        return [{"key": r["key"], "source_world": r["source_world"], "timestamp": r["timestamp"]} for r in cur]
 
     def delete_snapshot(self, key: str, commit: bool = True):
         with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("DELETE FROM snapshots WHERE key=?", (key,))
+            self.conn.execute("DELETE FROM snapshots WHERE key=?", (key,))
             if commit: self.conn.commit()
     
     def cleanup_snapshots_keep_recent(self, keep_n: int = CONFIG["MAX_SNAPSHOTS_PER_WORLD"]) -> int:
         with self.lock:
             cur = self.conn.cursor()
-            cur.execute("SELECT DISTINCT source_world FROM snapshots")
-            worlds_with_snaps = [row['source_world'] for row in cur.fetchall()]
-            
-            deleted_count = 0
-            for wid in worlds_with_snaps:
-                cur.execute("SELECT key FROM snapshots WHERE source_world=? ORDER BY timestamp DESC", (wid,))
-                keys = [row['key'] for row in cur.fetchall()]
-                if len(keys) > keep_n:
-                    keys_to_delete = keys[keep_n:]
-                    for key in keys_to_delete:
-                        cur.execute("DELETE FROM snapshots WHERE key=?", (key,))
-                    deleted_count += len(keys_to_delete)
+            # حذف واحد بدالة نافذة بدل SELECT لكل عالم ثم DELETE لكل لقطة
+            cur.execute(
+                """DELETE FROM snapshots WHERE key IN (
+                       SELECT key FROM (
+                           SELECT key, ROW_NUMBER() OVER (
+                               PARTITION BY source_world ORDER BY timestamp DESC) AS rn
+                           FROM snapshots)
+                       WHERE rn > ?)""",
+                (keep_n,))
+            deleted_count = cur.rowcount
             self.conn.commit()
             return deleted_count
 
     def save_player(self, player: dict, commit: bool = True):
         with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("INSERT OR REPLACE INTO player (key, data_json) VALUES (?, ?)", ("player", json.dumps(player, ensure_ascii=False)))
+            # blob مضغوط: أقل تضخيمًا للكتابة في WAL مع تكرار الحفظ العالي
+            blob = zlib.compress(json_dumps(player).encode("utf-8"), 3)
+            # لا تلمس القرص إن لم يتغير المحتوى منذ آخر حفظ
+            if blob == self._last_player_blob:
+                return
+            self.conn.execute("INSERT OR REPLACE INTO player (key, data_json) VALUES (?, ?)", ("player", blob))
+            self._last_player_blob = blob
             if commit: self.conn.commit()
 
     def load_player(self) -> Optional[dict]:
-        with self.lock:
-            cur = self.conn.cursor()
-            cur.execute("SELECT data_json FROM player WHERE key='player'")
-            r = cur.fetchone()
-            if not r: return None
-            try:
-                return json.loads(r["data_json"])
-            except Exception:
-                return None
+        r = self._reader().execute("SELECT data_json FROM player WHERE key='player'").fetchone()
+        if not r: return None
+        try:
+            raw = r["data_json"]
+            if isinstance(raw, bytes):
+                raw = zlib.decompress(raw)
+            return json_loads(raw)
+        except Exception:
+            return None
 
     def export_all(self, filename: str) -> str:
-        with self.lock:
-            data = {"worlds": {}, "snapshots": [], "player": None}
+        # كتابة متدفقة: عالم واحد في الذاكرة في كل لحظة بدل بناء قاموس ضخم أولاً
+        fname = safe_filename(filename)
+        with self.lock, open(fname, "w", encoding="utf-8") as f:
+            f.write('{"worlds": {')
+            first = True
             for wid in self.list_worlds():
                 w = self.load_world(wid)
-                data["worlds"][wid] = w.to_dict() if w else None
-            data["snapshots"] = self.list_snapshots()
-            pl = self.load_player()
-            if pl: data["player"] = pl
-            fname = safe_filename(filename)
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return fname
+                if not first: f.write(',')
+                first = False
+                f.write(json_dumps(wid))
+                f.write(': ')
+                f.write(json_dumps(w.to_dict() if w else None))
+            f.write('}, "snapshots": ')
+            f.write(json_dumps(self.list_snapshots()))
+            f.write(', "player": ')
+            f.write(json_dumps(self.load_player()))
+            f.write('}')
+        return fname
 
     def close(self):
         try:
             self.conn.close()
         except Exception:
             pass
+        reader = getattr(self._readers, "conn", None)
+        if reader is not None:
+            try:
+                reader.close()
+            except Exception:
+                pass
 
 # ---------------------------
 # اللاعب وحالته المحسنة
@@ -1084,7 +1436,7 @@ class InnerWorld:
     size_cubes: int = 0
     capacity_cubes: int = 10000
     ingested_keys: List[str] = field(default_factory=list)
-    elements: Dict[str,int] = field(default_factory=dict)
+    elements: Dict[str,int] = field(default_factory=Counter)
     creatures: List[CreatureInstance] = field(default_factory=list)
     mounts: Dict[str,str] = field(default_factory=dict)
     last_tick: float = field(default_factory=time.time)
@@ -1094,9 +1446,17 @@ class InnerWorld:
     settlements: List[HumanSettlement] = field(default_factory=list)
     effect_system: EffectSystem = field(default_factory=EffectSystem)
 
+    def __post_init__(self):
+        self._uid_cache: Dict[str, CreatureInstance] = {}
+        self._uid_cache_key = (-1, -1)
+        self._creatures_version = 0
+
+    # نفس فهرس المعرفات الكسول المستخدم في World
+    get_creature = World.get_creature
+
     def to_dict(self):
         return {
-            "id": self.id, "name": self.name, "size_cubes": self.size_cubes, 
+            "id": self.id, "name": self.name, "size_cubes": self.size_cubes,
             "capacity_cubes": self.capacity_cubes, "ingested_keys": self.ingested_keys, 
             "elements": self.elements, "creatures": [c.to_dict() for c in self.creatures], 
             "mounts": self.mounts, "last_tick": self.last_tick,
@@ -1109,11 +1469,17 @@ class InnerWorld:
 
     @staticmethod
     def from_dict(d):
-        iw = InnerWorld(d.get("id","inner_hero"), d.get("name","عالمك الداخلي"))
+        # تهيئة مباشرة: كل الحقول تُسند أدناه فلا داعي لتشغيل المصانع الافتراضية
+        iw = InnerWorld.__new__(InnerWorld)
+        iw._uid_cache = {}
+        iw._uid_cache_key = (-1, -1)
+        iw._creatures_version = 0
+        iw.id = d.get("id","inner_hero")
+        iw.name = d.get("name","عالمك الداخلي")
         iw.size_cubes = d.get("size_cubes",0)
         iw.capacity_cubes = d.get("capacity_cubes",10000)
         iw.ingested_keys = d.get("ingested_keys",[])
-        iw.elements = d.get("elements",{})
+        iw.elements = Counter(d.get("elements",{}))
         iw.creatures = [CreatureInstance.from_dict(cd) for cd in d.get("creatures",[])]
         iw.mounts = d.get("mounts",{})
         iw.last_tick = d.get("last_tick", time.time())
@@ -1132,7 +1498,7 @@ class Player:
     qi: float = 200.0
     hp: float = 1000.0
     inner: InnerWorld = field(default_factory=InnerWorld)
-    inventory: Dict[str,int] = field(default_factory=dict)
+    inventory: Dict[str,int] = field(default_factory=Counter)
     skills: Dict[str, int] = field(default_factory=lambda: {
         "ingestion_efficiency": 1,
         "qi_mastery": 1,
@@ -1172,7 +1538,7 @@ class Player:
         while self.xp >= xp_needed:
             self.xp -= xp_needed
             self.level += 1
-            self.qi = min(5000.0, self.qi + 60)
+            self.qi = min(QI_MAX, self.qi + 60)
             self.hp = min(500.0, self.hp + 10)
             leveled = True
             xp_needed = 100 * (1.5 **(self.level - 1))
@@ -1196,19 +1562,25 @@ class Player:
         
         return None
 
+    # تبنى مرة واحدة على مستوى الصنف بدل إعادة البناء في كل استدعاء
+    _SKILL_NAMES = {
+        "ingestion_efficiency": "كفاءة الابتلاع",
+        "qi_mastery": "إتقان الطاقة",
+        "cultivation": "الزراعة",
+        "combat": "القتال",
+        "building": "البناء",
+        "trading": "التجارة",
+        "gathering": "الجمع",
+        "crafting": "الصنعة"
+    }
+    _FACTION_NAMES = {
+        "traders_guild": "نقابة التجار",
+        "spirit_council": "مجلس الأرواح",
+        "forest_guardians": "حراس الغابة"
+    }
     def get_skill_name(self, skill_key: str) -> str:
         """ترجمة مفاتيح المهارات إلى أسماء عربية"""
-        skill_names = {
-            "ingestion_efficiency": "كفاءة الابتلاع",
-            "qi_mastery": "إتقان الطاقة",
-            "cultivation": "الزراعة",
-            "combat": "القتال",
-            "building": "البناء",
-            "trading": "التجارة",
-            "gathering": "الجمع",
-            "crafting": "الصنعة"
-        }
-        return skill_names.get(skill_key, skill_key)
+        return self._SKILL_NAMES.get(skill_key, skill_key)
 
     def auto_use_items(self) -> str:
         """استخدام العناصر تلقائياً عند الحاجة"""
@@ -1272,15 +1644,9 @@ class Player:
     def show_reputation(self) -> str:
         """عرض سمعة اللاعب"""
         output = ["🎭 سمعتك:"]
-        
-        faction_names = {
-            "traders_guild": "نقابة التجار",
-            "spirit_council": "مجلس الأرواح",
-            "forest_guardians": "حراس الغابة"
-        }
-        
+
         for faction, rep in self.reputation.items():
-            faction_name = faction_names.get(faction, faction)
+            faction_name = self._FACTION_NAMES.get(faction, faction)
             status = "🔴 عداء" if rep < -50 else "🟡 محايد" if rep < 50 else "🟢 صداقة"
             output.append(f"{faction_name}: {rep} {status}")
         
@@ -1294,14 +1660,16 @@ class Player:
         
         return "\n".join(output)
 
+    # يبنى مرة واحدة على مستوى الصنف بدل إعادة البناء في كل استدعاء
+    _EFFECT_NAMES = {
+        "price_advantage": "ميزة السعر",
+        "qi_generation": "توليد الطاقة",
+        "plant_growth_boost": "تعزيز نمو النباتات"
+    }
+
     def _get_effect_name(self, effect_key: str) -> str:
         """ترجمة مفاتيح التأثيرات إلى أسماء عربية"""
-        effect_names = {
-            "price_advantage": "ميزة السعر",
-            "qi_generation": "توليد الطاقة",
-            "plant_growth_boost": "تعزيز نمو النباتات"
-        }
-        return effect_names.get(effect_key, effect_key)
+        return self._EFFECT_NAMES.get(effect_key, effect_key)
 
     def to_dict(self):
         return {
@@ -1318,14 +1686,15 @@ class Player:
 
     @staticmethod
     def from_dict(d):
-        p = Player()
+        # تهيئة مباشرة: كل الحقول تُسند أدناه فلا داعي لتشغيل المصانع الافتراضية
+        p = Player.__new__(Player)
         p.name = d.get("name","البطل")
         p.level = d.get("level",1)
         p.xp = d.get("xp",0.0)
         p.qi = d.get("qi",200.0)
         p.hp = d.get("hp",1000.0)
         p.inner = InnerWorld.from_dict(d.get("inner",{}))
-        p.inventory = d.get("inventory",{})
+        p.inventory = Counter(d.get("inventory",{}))
         p.skills = d.get("skills", {
             "ingestion_efficiency": 1, 
             "qi_mastery": 1, 
@@ -1351,20 +1720,47 @@ class Player:
         })
         return p
 
+# رسائل الأخطاء المتكررة: مرجع واحد لكل نص بدل تكرار الحرفية في كل مسار
+_ERR_NO_WORLD = "العالم غير موجود."
+_ERR_NO_CREATURE_ANY = "المخلوق غير موجود في أي عالم."
+_ERR_NO_CREATURE_HERE = "المخلوق غير موجود في هذا العالم."
+_ERR_NO_SETTLEMENT = "المستوطنة غير موجودة"
+
+# قائمة فارغة مشتركة تعيدها أنظمة الدورة الصامتة (verbose=False):
+# كل الإضافات مشروطة بـ verbose فلا تُلمس أبدًا، وتوفر إنشاء قائمة لكل استدعاء
+_NO_MSGS: List[str] = []
+
 # ---------------------------
 # المحرك Engine المحسن
 # ---------------------------
 class Engine:
     def __init__(self):
+        _ensure_logging()
         self.storage = Storage(DB_FILE)
         self.player = self._load_or_new_player()
+        # نسخة بالذاكرة من معرفات العوالم: توفر استعلام SELECT لكل تكرار
+        self._all_world_ids: Set[str] = set(self.storage.list_worlds())
         self._ensure_world_pool()
         self.lock = threading.RLock()
-        self._cached_worlds: Dict[str, World] = {}
+        # كاش LRU محدود الحجم + فهرس اسم مطبّع -> معرف لتجنب المسح الخطي
+        self._cached_worlds: "OrderedDict[str, World]" = OrderedDict()
+        self._name_index: Dict[str, str] = {}
         self._cache_timestamp = time.time()
         self._last_cache_cleanup = time.time()
-        self.skill_system = SkillSystem()
-        self.profession_system = ProfessionSystem()
+        self.skill_system = SKILL_SYSTEM
+        self.profession_system = PROFESSION_SYSTEM
+        # تغييرات اللاعب والعوالم تؤجل وتكتب دفعة مع دورة المحاكاة بدل COMMIT لكل أمر
+        self._player_dirty = False
+        self._dirty_worlds: Set[str] = set()
+        # آخر تفريغ للدفعة (ساعة رتيبة): الدورات الخلفية تكتب كل فترة لا كل مرة
+        self._last_flush = time.monotonic()
+        # قائمة رسائل معاد استعمالها عبر دورات الخلفية بدل إنشائها كل مرة
+        self._msg_scratch: List[str] = []
+        # فهرس اسم المستوطنة -> موقعها ("" للعالم الداخلي أو معرف العالم)
+        self._settlement_loc: Dict[str, str] = {}
+        # مولد عشوائي واحد للمحاكاة: تهيئة حالة Mersenne مرة واحدة
+        # بدل إنشاء Random جديد عند كل استدعاء للدورة
+        self._sim_rnd = random.Random(int.from_bytes(os.urandom(8), "big"))
 
     def _load_or_new_player(self) -> Player:
         pj = self.storage.load_player()
@@ -1372,18 +1768,22 @@ class Engine:
             try:
                 return Player.from_dict(pj)
             except Exception:
-                logging.exception("Failed to load player data")
+                _LOG.exception("Failed to load player data")
         p = Player()
-        p.inventory = {"herb_common": 12, "iron": 3, "wood": 20, "stone": 15, "food": 10}
+        p.inventory = Counter({"herb_common": 12, "iron": 3, "wood": 20, "stone": 15, "food": 10})
         self.storage.save_player(p.to_dict())
         return p
 
     def _ensure_world_pool(self):
-        wids = self.storage.list_worlds()
-        while len(wids) < CONFIG.get("WORLD_POOL_MIN", 6):
-            w = WorldGenerator.generate(size_tier=random.choice(["small","medium","large"]))
-            self.storage.save_world(w)
-            wids = self.storage.list_worlds()
+        # حفظ كل العوالم الناقصة في معاملة واحدة: COMMIT واحد بدل واحد لكل عالم
+        needed = CONFIG.get("WORLD_POOL_MIN", 6) - len(self._all_world_ids)
+        if needed <= 0: return
+        with self.storage.lock:
+            for _ in range(needed):
+                w = WorldGenerator.generate(size_tier=random.choice(["small","medium","large"]))
+                self.storage.save_world(w, commit=False)
+                self._all_world_ids.add(w.id)
+            self.storage.conn.commit()
 
     def _get_cached_world(self, wid: str) -> Optional[World]:
         # تنظيف الكاش بشكل دوري
@@ -1392,153 +1792,240 @@ class Engine:
             self._clean_cache()
             self._last_cache_cleanup = now
             
-        if wid in self._cached_worlds:
-            self._cached_worlds[wid].last_access = now
-            return self._cached_worlds[wid]
-            
+        cached = self._cached_worlds.get(wid)
+        if cached is not None:
+            cached.last_access = now
+            self._cached_worlds.move_to_end(wid)
+            return cached
+
         w = self.storage.load_world(wid)
         if w:
             w.last_access = now
-            self._cached_worlds[wid] = w
+            self._cache_insert(w)
         return w
 
+    def _mark_world_dirty(self, w: World):
+        self._dirty_worlds.add(w.id)
+
+    def _flush_dirty(self):
+        """كتابة الحالة المؤجلة كلها في معاملة واحدة.
+
+        فشل حفظ عالم واحد لا يوقف الباقي: كل عالم داخل SAVEPOINT يُسترجع
+        عند الخطأ ويبقى العالم مؤشرًا ليُعاد في الدفعة التالية، بدل أن
+        يهرب الاستثناء وسط المعاملة ويعطل كل الحفظ الخلفي بعده.
+        """
+        if not self._dirty_worlds and not self._player_dirty:
+            return
+        with self.storage.lock:
+            conn = self.storage.conn
+            for wid in list(self._dirty_worlds):
+                w = self._cached_worlds.get(wid)
+                if w is None:
+                    self._dirty_worlds.discard(wid)
+                    continue
+                try:
+                    conn.execute("SAVEPOINT world_flush")
+                    self.storage.save_world(w, commit=False)
+                    conn.execute("RELEASE SAVEPOINT world_flush")
+                    self._dirty_worlds.discard(wid)
+                except Exception:
+                    conn.execute("ROLLBACK TO SAVEPOINT world_flush")
+                    conn.execute("RELEASE SAVEPOINT world_flush")
+                    _LOG.exception("Failed to save world %s; will retry next flush", wid)
+            if self._player_dirty:
+                try:
+                    self.storage.save_player(self.player.to_dict(), commit=False)
+                    self._player_dirty = False
+                except Exception:
+                    _LOG.exception("Failed to save player; will retry next flush")
+            conn.commit()
+
+    def _cache_insert(self, w: World):
+        """إدراج في الكاش مع إزاحة الأقدم عند تجاوز الحد الأقصى"""
+        self._cached_worlds[w.id] = w
+        self._cached_worlds.move_to_end(w.id)
+        self._name_index[w._name_norm] = w.id
+        max_cached = CONFIG.get("WORLD_CACHE_MAX", 64)
+        while len(self._cached_worlds) > max_cached:
+            _, evicted = self._cached_worlds.popitem(last=False)
+            self._name_index.pop(evicted._name_norm, None)
+            # لا تفقد تعديلات عالم مؤجل أزاحه الكاش
+            if evicted.id in self._dirty_worlds:
+                self._dirty_worlds.discard(evicted.id)
+                self.storage.save_world(evicted)
+
+    def _cache_evict(self, wid: str):
+        w = self._cached_worlds.pop(wid, None)
+        if w is not None:
+            self._name_index.pop(w._name_norm, None)
+            # لا تفقد تعديلات عالم مؤجل أزيح قبل دورة الكتابة
+            if wid in self._dirty_worlds:
+                self._dirty_worlds.discard(wid)
+                self.storage.save_world(w)
+
     def _clean_cache(self):
         """تنظيف الكاش من العوالم التي لم يتم استخدامها مؤخراً"""
         now = time.time()
-        to_remove = [wid for wid, w in self._cached_worlds.items() 
+        to_remove = [wid for wid, w in self._cached_worlds.items()
                     if now - w.last_access > CONFIG["CACHE_CLEANUP_INTERVAL"]]
         for wid in to_remove:
-            del self._cached_worlds[wid]
+            self._cache_evict(wid)
 
     def resolve_world(self, key: str) -> Optional[World]:
         if not key: return None
-        
-        # البحث في الكاش أولاً
-        for wid, world in self._cached_worlds.items():
-            if key == wid or key in normalize_ar_text(world.name):
-                world.last_access = time.time()
-                return world
-                
+
+        # البحث في الكاش أولاً: معرف مباشر ثم فهرس الاسم المطبّع
+        hit = self._cached_worlds.get(key)
+        if hit is None:
+            hit_wid = self._name_index.get(normalize_ar_text(key))
+            if hit_wid: hit = self._cached_worlds.get(hit_wid)
+        if hit is not None:
+            hit.last_access = time.time()
+            self._cached_worlds.move_to_end(hit.id)
+            return hit
+
         # البحث في قاعدة البيانات
         w = self.storage.load_world(key)
-        if w: 
+        if w:
             w.last_access = time.time()
-            self._cached_worlds[w.id] = w
+            self._cache_insert(w)
             return w
             
         kn = normalize_ar_text(key)
-        for wid in self.storage.list_worlds():
+        for wid in self._all_world_ids:
             wtemp = self._get_cached_world(wid)
             if not wtemp: continue
-            if kn in wtemp.id or kn in normalize_ar_text(wtemp.name):
+            if kn in wtemp.id or kn in wtemp._name_norm:
                 return wtemp
         return None
 
     def find_creature_and_world_by_uid(self, uid: str) -> Optional[Tuple[World, CreatureInstance]]:
-        for wid in self.storage.list_worlds():
+        # بحث واحد في فهرس قاعدة البيانات بدل تحميل كل العوالم ومسح مخلوقاتها
+        wid = self.storage.find_creature_world(uid)
+        if wid:
             w = self._get_cached_world(wid)
-            if not w: continue
-            for cre in w.creatures:
-                if cre.uid == uid:
+            if w:
+                cre = w.get_creature(uid)
+                if cre is not None:
                     return w, cre
+        # مخلوق لم يُحفظ بعد (مولود جديد في الكاش): مسح الكاش فقط
+        for w in self._cached_worlds.values():
+            cre = w.get_creature(uid)
+            if cre is not None:
+                return w, cre
         return None
         
+    # القراءة أيضًا تحتاج القفل: الخيط الخلفي يعدل عناصر ومخلوقات ومستوطنات
+    # النسخ المكاشة نفسها، والمرور على قاموس يتغير حجمه يرمي RuntimeError
     def list_worlds_brief(self) -> List[str]:
-        out = []
-        for wid in self.storage.list_worlds():
-            w = self._get_cached_world(wid)
-            if not w: continue
-            
-            # إضافة علامة إذا كان العالم مكتشفاً
-            explored = "✓" if w.id in self.player.discovered_worlds else "✗"
-            biome_name = BIOMES.get(w.biome, {"name": w.biome})["name"]
-            
+        with self.lock:
+            out = []
+            for wid in self._all_world_ids:
+                w = self._get_cached_world(wid)
+                if not w: continue
+
+                # إضافة علامة إذا كان العالم مكتشفاً
+                explored = "✓" if w.id in self.player.discovered_worlds else "✗"
+                biome_name = BIOME_NAMES.get(w.biome, w.biome)
+
+                settlement_info = ""
+                if w.settlements:
+                    settlement_info = f" | مستوطنات: {len(w.settlements)}"
+
+                out.append(f"{explored} {w.id} -> {w.name} | نمط={biome_name} | مخلوقات={len(w.creatures)}{settlement_info} | صعوبة={w.difficulty}")
+            return out
+
+    def describe_world(self, key: str) -> str:
+        with self.lock:
+            w = self.resolve_world(key)
+            if not w: return _ERR_NO_WORLD
+
+            # وضع علامة على العالم كمكتشف
+            if w.id not in self.player.discovered_worlds:
+                self.player.discovered_worlds.append(w.id)
+                self._player_dirty = True
+
+            biome_name = BIOME_NAMES.get(w.biome, w.biome)
+
             settlement_info = ""
             if w.settlements:
-                settlement_info = f" | مستوطنات: {len(w.settlements)}"
-            
-            out.append(f"{explored} {w.id} -> {w.name} | نمط={biome_name} | مخلوقات={len(w.creatures)}{settlement_info} | صعوبة={w.difficulty}")
-        return out
+                total_population = sum(settlement.population for settlement in w.settlements)
+                settlement_info = f" | سكان: {total_population}"
 
-    def describe_world(self, key: str) -> str:
-        w = self.resolve_world(key)
-        if not w: return "العالم غير موجود."
-        
-        # وضع علامة على العالم كمكتشف
-        if w.id not in self.player.discovered_worlds:
-            self.player.discovered_worlds.append(w.id)
-            self.storage.save_player(self.player.to_dict())
-        
-        biome_data = BIOMES.get(w.biome, {})
-        biome_name = biome_data.get("name", w.biome)
-        
-        settlement_info = ""
-        if w.settlements:
-            total_population = sum(settlement.population for settlement in w.settlements)
-            settlement_info = f" | سكان: {total_population}"
-        
-        return (f"{colored_text(w.name, Colors.CYAN)}: {w.description}. "
-                f"حجم={w.size_cubes}, عناصر={w.total_elements()}, "
-                f"مخلوقات={len(w.creatures)}{settlement_info}, سعة={w.carrying_capacity}.")
+            return (f"{colored_text(w.name, Colors.CYAN)}: {w.description}. "
+                    f"حجم={w.size_cubes}, عناصر={w.total_elements()}, "
+                    f"مخلوقات={len(w.creatures)}{settlement_info}, سعة={w.carrying_capacity}.")
 
     def list_creatures(self, key: str) -> str:
-        w = self.resolve_world(key)
-        if not w: return "العالم غير موجود."
-        if not w.creatures: return f"لا توجد مخلوقات في {w.name}."
-        
-        lines = [f"مخلوقات في {w.name}:"]
-        for c in w.creatures:
-            spec = CREATURES.get(c.spec_id, {"name": c.spec_id})
-            health_percent = c.energy / spec.get("energy_max", 1) * 100
-            health_color = Colors.GREEN if health_percent > 70 else Colors.YELLOW if health_percent > 30 else Colors.RED
-            
-            summon_info = ""
-            if c.summoned:
-                time_left = c.summon_expires - time.time()
-                if time_left > 0:
-                    summon_info = f" | مستدعى: {int(time_left)}s"
+        with self.lock:
+            w = self.resolve_world(key)
+            if not w: return _ERR_NO_WORLD
+            if not w.creatures: return f"لا توجد مخلوقات في {w.name}."
+
+            lines = [f"مخلوقات في {w.name}:"]
+            now = time.time()  # قراءة واحدة للساعة تكفي كل السطور
+            end = Colors.END
+            for c in w.creatures:
+                spec = CREATURES.get(c.spec_id, {"name": c.spec_id})
+                health_percent = c.energy / spec.get("energy_max", 1) * 100
+                health_color = Colors.GREEN if health_percent > 70 else Colors.YELLOW if health_percent > 30 else Colors.RED
+
+                if c.summoned:
+                    time_left = c.summon_expires - now
+                    summon_info = f" | مستدعى: {int(time_left)}s" if time_left > 0 else " | مستدعى: منتهي"
                 else:
-                    summon_info = " | مستدعى: منتهي"
-            
-            lines.append(
-                f"[{c.uid}] {spec['name']} ({c.spec_id}) | "
-                f"{colored_text(f'طاقة={c.energy:.1f}', health_color)} | عمر={c.age}{summon_info}"
-            )
-        return "\n".join(lines)
+                    summon_info = ""
+
+                lines.append(
+                    f"[{c.uid}] {spec['name']} ({c.spec_id}) | "
+                    f"{health_color}طاقة={c.energy:.1f}{end} | عمر={c.age}{summon_info}"
+                )
+            return "\n".join(lines)
 
     def gather(self, key: str, count: int = 1) -> str:
         with self.lock:
             w = self.resolve_world(key)
-            if not w: return "العالم غير موجود."
+            if not w: return _ERR_NO_WORLD
             if w.total_elements() == 0: return "لا توجد عناصر في هذا العالم."
             
+            # سحب دفعة واحدة بالأوزان الحالية بدل إعادة بناء القوائم لكل مكعب
+            want = min(count, w.total_elements())
             gathered = {}
-            for _ in range(min(count, w.total_elements())):
-                choices = list(w.elements.items())
-                if not choices: break
-                ids, weights = zip(*choices)
-                pick = random.choices(ids, weights=weights, k=1)[0]
-                gathered[pick] = gathered.get(pick,0) + 1
-                w.elements[pick] -= 1
-                if w.elements[pick] <= 0: del w.elements[pick]
-                
-                # XP مكافأة تعتمد على ندرة المورد
-                rarity = BLOCKS.get(pick,{}).get("rarity", 0.2)
-                gain = (1.0 / (rarity + 0.05)) * 0.5
-                self.player.gain_xp(gain)
-                
+            picked = 0
+            rnd_choices = random.choices  # ربط محلي: يوفر بحث الاسم العام لكل دفعة
+            while picked < want and w.elements:
+                ids = list(w.elements.keys())
+                weights = list(w.elements.values())
+                batch = rnd_choices(ids, weights=weights, k=want - picked)
+                # مسار سريع للسحب المفرد (الحالة الشائعة للأمر بدون عدد)
+                tally = {batch[0]: 1} if len(batch) == 1 else Counter(batch)
+                for pick, n in tally.items():
+                    t = min(n, w.elements.get(pick, 0))
+                    if t <= 0: continue
+                    gathered[pick] = gathered.get(pick, 0) + t
+                    w.elements[pick] -= t
+                    if w.elements[pick] <= 0: del w.elements[pick]
+                    picked += t
+
+            # XP مكافأة تعتمد على ندرة المورد، مجمعة لكل الدفعة
+            level_up_msg = None
+            if picked:
+                xp_total = sum((1.0 / (BLOCKS.get(k, {}).get("rarity", 0.2) + 0.05)) * 0.5 * v
+                               for k, v in gathered.items())
+                self.player.gain_xp(xp_total)
+
                 # خبرة مهارة الجمع
-                xp_gained = self.skill_system.gain_skill_xp("gathering", "gather", 1.0)
+                xp_gained = self.skill_system.gain_skill_xp("gathering", "gather", float(picked))
                 level_up_msg = self.player.gain_skill_xp("gathering", xp_gained)
-                
+
             for k,v in gathered.items():
-                self.player.inventory[k] = self.player.inventory.get(k,0) + v
+                self.player.inventory[k] += v
                 
-            self.storage.save_world(w)
-            self.storage.save_player(self.player.to_dict())
+            self._mark_world_dirty(w)
+            self._player_dirty = True
             
             if not gathered: return "لم تجمع شيئًا."
-            parts = [f"{v}× {BLOCKS.get(k,{'name':k})['name']}" for k,v in gathered.items()]
+            parts = [f"{v}× {block_name(k)}" for k,v in gathered.items()]
             
             result = "جمعت: " + "، ".join(parts) + "."
             if level_up_msg:
@@ -1548,7 +2035,7 @@ class Engine:
     def ingest(self, key: str, requested: Optional[int] = None) -> str:
         with self.lock:
             w = self.resolve_world(key)
-            if not w: return "العالم غير موجود."
+            if not w: return _ERR_NO_WORLD
             total = w.total_elements()
             if total == 0: return "لا توجد عناصر للابتلاع."
             
@@ -1569,8 +2056,10 @@ class Engine:
             take = per if requested is None else min(per, requested)
             take = min(take, total)
             
-            # ترتيب العناصر حسب الندرة (الأندر أولاً)
-            pool = sorted(w.elements.items(), key=lambda kv: get_rarity(kv[0]))
+            # الأندر أولاً: كل عنصر مأخوذ يستهلك مكعبًا واحدًا على الأقل،
+            # فيكفي أصغر take عناصر بدل فرز القاموس كاملًا
+            pool = heapq.nsmallest(min(len(w.elements), take), w.elements.items(),
+                                   key=lambda kv: _RARITY.get(kv[0], 1.0))
             
             ingested = {}
             rem = take
@@ -1582,32 +2071,36 @@ class Engine:
                 if w.elements[bid] <= 0: del w.elements[bid]
                 rem -= t
                 
+            taken = take - rem  # مجموع المبتلع معروف من العداد؛ لا حاجة لجمع القاموس ثلاث مرات
             snap_key = make_key(w.id)
             snap = {
-                "elements": ingested, 
-                "source": w.id, 
-                "time": time.time(), 
-                "size": sum(ingested.values()), 
+                "elements": ingested,
+                "source": w.id,
+                "time": time.time(),
+                "size": taken,
                 "seed": w.seed
             }
             
             self.storage.save_snapshot(snap_key, w.id, snap)
             
             for bid,cnt in ingested.items():
-                self.player.inner.elements[bid] = self.player.inner.elements.get(bid,0) + cnt
+                self.player.inner.elements[bid] += cnt
                 
-            self.player.inner.size_cubes = sum(self.player.inner.elements.values())
+            self.player.inner.size_cubes += taken
             self.player.inner.ingested_keys.append(snap_key)
             
-            # توليد الجوهر من العناصر المبتلعة
+            # توليد الجوهر من العناصر المبتلعة: الاحتمال ثابت لكل نوع،
+            # فيُحسب مرة واحدة ويجمع النجاح دفعة بدل تحديث القواميس لكل مكعب
             essence_gained = {}
+            level_bonus = self.player.level * 0.01
+            rand = random.random  # ربط محلي للحلقة الداخلية
             for bid,cnt in ingested.items():
-                for _ in range(cnt):
-                    prob = min(0.6, 0.08 + (1 - BLOCKS.get(bid,{"rarity":1})["rarity"]) * 0.25 + self.player.level * 0.01)
-                    if random.random() < prob:
-                        ess = f"essence_{bid}"
-                        essence_gained[ess] = essence_gained.get(ess, 0) + 1
-                        self.player.inventory[ess] = self.player.inventory.get(ess,0) + 1
+                prob = min(0.6, 0.08 + (1 - _RARITY.get(bid, 1.0)) * 0.25 + level_bonus)
+                k = sum(rand() < prob for _ in range(cnt))
+                if k:
+                    ess = f"essence_{bid}"
+                    essence_gained[ess] = k  # معرفات العناصر فريدة داخل الحلقة
+                    self.player.inventory[ess] += k
                         
             self.player.gain_xp(take * 0.9)
             
@@ -1633,16 +2126,17 @@ class Engine:
             # إذا تم ابتلاع العالم بالكامل، حذفه وإنشاء عالم جديد
             if w.total_elements() == 0 and len(w.creatures) == 0:
                 self.storage.delete_world(w.id)
-                if w.id in self._cached_worlds:
-                    del self._cached_worlds[w.id]
+                self._all_world_ids.discard(w.id)
+                self._dirty_worlds.discard(w.id)
+                self._cache_evict(w.id)
                 self._ensure_world_pool()
             else:
-                self.storage.save_world(w)
+                self._mark_world_dirty(w)
                 
-            self.storage.save_player(self.player.to_dict())
+            self._player_dirty = True
             
-            parts = [f"{v}× {BLOCKS.get(k,{'name':k})['name']}" for k,v in ingested.items()]
-            result = f"ابتلعت {sum(ingested.values())} مكعبات: " + "، ".join(parts) + f". مفتاح: {snap_key}."
+            parts = [f"{v}× {block_name(k)}" for k,v in ingested.items()]
+            result = f"ابتلعت {taken} مكعبات: " + "، ".join(parts) + f". مفتاح: {snap_key}."
             
             if essence_gained:
                 essence_parts = [f"{v}× {k}" for k,v in essence_gained.items()]
@@ -1661,22 +2155,22 @@ class Engine:
                 if result:
                     w, cre = result
                 else:
-                    return "المخلوق غير موجود في أي عالم."
+                    return _ERR_NO_CREATURE_ANY
             else: # Ingest using world key and UID
                 w = self.resolve_world(key_or_uid)
-                if not w: return "العالم غير موجود."
-                cre = next((c for c in w.creatures if c.uid == creature_uid), None)
+                if not w: return _ERR_NO_WORLD
+                cre = w.get_creature(creature_uid)
                 if not cre:
                     # Fallback to search all worlds if not found in the specified one
                     result = self.find_creature_and_world_by_uid(creature_uid)
                     if result:
                         w, cre = result
                     else:
-                        return "المخلوق غير موجود في هذا العالم."
+                        return _ERR_NO_CREATURE_HERE
 
             spec = CREATURES.get(cre.spec_id)
             if not spec: return "نوع المخلوق غير معروف."
-            if any(c.uid == cre.uid for c in self.player.inner.creatures):
+            if self.player.inner.get_creature(cre.uid) is not None:
                 return "لقد ابتلعت هذا المخلوق بالفعل."
                 
             cost_cubes = max(1, int(spec["energy_max"] * 0.04))
@@ -1687,21 +2181,22 @@ class Engine:
             self.player.inner.creatures.append(inner_cre)
             self.player.inner.size_cubes += cost_cubes
             
-            if cre in w.creatures:
-                w.creatures.remove(cre)
-            
+            # مسح واحد بدل فحص العضوية ثم الإزالة الخطيين
+            w.creatures = [c for c in w.creatures if c is not cre]
+            w._creatures_version += 1
+
             # فرصة الحصول على جوهر المخلوق
             essence_chance = 0.3 + (self.player.skills.get("qi_mastery", 1) * 0.1)
             if random.random() < essence_chance:
                 essence_id = f"essence_{cre.spec_id}"
-                self.player.inventory[essence_id] = self.player.inventory.get(essence_id, 0) + 1
+                self.player.inventory[essence_id] += 1
                 essence_msg = " وحصلت على جوهر المخلوق!"
             else:
                 essence_msg = ""
             
             self.player.gain_xp(30.0)
-            self.storage.save_world(w)
-            self.storage.save_player(self.player.to_dict())
+            self._mark_world_dirty(w)
+            self._player_dirty = True
             return f"نجحت في ابتلاع {spec['name']} ({cre.uid}) وأصبح داخل عالمك.{essence_msg}"
 
     def energy_attack(self, key_or_uid: str, creature_uid: Optional[str] = None, energy_cost: float = 25.0) -> str:
@@ -1722,18 +2217,18 @@ class Engine:
                 if result:
                     w, cre = result
                 else:
-                    return "المخلوق غير موجود في أي عالم."
+                    return _ERR_NO_CREATURE_ANY
             else: # Attack using world key and UID
                 w = self.resolve_world(key_or_uid)
-                if not w: return "العالم غير موجود."
-                cre = next((c for c in w.creatures if c.uid == creature_uid), None)
+                if not w: return _ERR_NO_WORLD
+                cre = w.get_creature(creature_uid)
                 if not cre:
                     # Fallback to search all worlds if not found in the specified one
                     result = self.find_creature_and_world_by_uid(creature_uid)
                     if result:
                         w, cre = result
                     else:
-                        return "المخلوق غير موجود في هذا العالم."
+                        return _ERR_NO_CREATURE_HERE
 
             spec = CREATURES.get(cre.spec_id)
             if not spec: return "نوع المخلوق غير معروف."
@@ -1747,14 +2242,14 @@ class Engine:
             out = f"هاجمت طاقيًا {spec['name']} بـ{damage:.1f} ضرر. طاقة المخلوق الآن {cre.energy:.1f}."
             
             if cre.energy <= 0:
-                if cre in w.creatures:
-                    w.creatures.remove(cre)
-                
+                w.creatures = [c for c in w.creatures if c is not cre]
+                w._creatures_version += 1
+
                 # إضافة موارد واقعية من الجثة
-                w.elements["corpse"] = w.elements.get("corpse", 0) + 1
-                w.elements["bones"] = w.elements.get("bones", 0) + 1
+                w.elements["corpse"] += 1
+                w.elements["bones"] += 1
                 essence = f"essence_{cre.spec_id}"
-                self.player.inventory[essence] = self.player.inventory.get(essence,0) + 1
+                self.player.inventory[essence] += 1
                 
                 self.player.gain_xp(25.0 * (1.0/(spec.get("rarity",0.1)+0.01)))
                 out += f" {spec['name']} هُزم وحصلت على {essence} وعظام وجثة."
@@ -1765,8 +2260,8 @@ class Engine:
             if level_up_msg:
                 out += " " + level_up_msg
                 
-            self.storage.save_world(w)
-            self.storage.save_player(self.player.to_dict())
+            self._mark_world_dirty(w)
+            self._player_dirty = True
             return out
     
     def plant(self, item_id: str, count: int = 1) -> str:
@@ -1790,14 +2285,14 @@ class Engine:
             if self.player.inventory[item_id] <= 0: 
                 del self.player.inventory[item_id]
                 
-            self.player.inner.elements[item_id] = self.player.inner.elements.get(item_id,0) + count
+            self.player.inner.elements[item_id] += count
             self.player.inner.size_cubes += count
             
             # خبرة مهارة الزراعة
             xp_gained = self.skill_system.gain_skill_xp("cultivation", "plant", count)
             level_up_msg = self.player.gain_skill_xp("cultivation", xp_gained)
             
-            self.storage.save_player(self.player.to_dict())
+            self._player_dirty = True
             
             result = f"زرعت {count}× {BLOCKS[item_id]['name']} داخل عالمك الداخلي."
             if level_up_msg:
@@ -1814,21 +2309,21 @@ class Engine:
                 del self.player.inner.elements[item_id]
                 
             self.player.inner.size_cubes = max(0, self.player.inner.size_cubes - count)
-            self.player.inventory[item_id] = self.player.inventory.get(item_id,0) + count
+            self.player.inventory[item_id] += count
             
             # إنتاج البذور من النباتات
             if item_id in ELEMENT_RELATIONSHIPS and "produces" in ELEMENT_RELATIONSHIPS[item_id]:
                 for product in ELEMENT_RELATIONSHIPS[item_id]["produces"]:
                     if random.random() < 0.3:  # 30% chance for seeds
-                        self.player.inventory[product] = self.player.inventory.get(product, 0) + 1
+                        self.player.inventory[product] += 1
             
             # خبرة مهارة الزراعة
             xp_gained = self.skill_system.gain_skill_xp("cultivation", "harvest", count)
             level_up_msg = self.player.gain_skill_xp("cultivation", xp_gained)
             
-            self.storage.save_player(self.player.to_dict())
+            self._player_dirty = True
             
-            result = f"حصدت {count}× {BLOCKS.get(item_id,{'name':item_id})['name']} وأضيفت إلى المخزن."
+            result = f"حصدت {count}× {block_name(item_id)} وأضيفت إلى المخزن."
             if level_up_msg:
                 result += " " + level_up_msg
             return result
@@ -1836,9 +2331,9 @@ class Engine:
     def mount(self, key: str, point: str) -> str:
         with self.lock:
             w = self.resolve_world(key)
-            if not w: return "العالم غير موجود."
+            if not w: return _ERR_NO_WORLD
             self.player.inner.mounts[point] = w.id
-            self.storage.save_player(self.player.to_dict())
+            self._player_dirty = True
             return f"ركبت {w.name} في '{point}'."
 
     def unmount(self, point: str) -> str:
@@ -1846,7 +2341,7 @@ class Engine:
             if point not in self.player.inner.mounts:
                 return "نقطة التركيب غير موجودة."
             wid = self.player.inner.mounts.pop(point)
-            self.storage.save_player(self.player.to_dict())
+            self._player_dirty = True
             return f"ألغيت تركيب {wid} من '{point}'."
 
     def list_snapshots(self) -> str:
@@ -1860,7 +2355,7 @@ class Engine:
     def show_snapshot(self, key: str) -> str:
         sn = self.storage.load_snapshot(key)
         if not sn: return "لا توجد لقطة بهذا المفتاح."
-        return json.dumps(sn["data"], ensure_ascii=False, indent=2)
+        return json_dumps_pretty(sn["data"])
 
     def delete_snapshot(self, key: str) -> str:
         self.storage.delete_snapshot(key)
@@ -1872,335 +2367,326 @@ class Engine:
         return f"تم حذف {deleted_count} لقطة، والاحتفاظ بـ{keep_n} لقطة لكل عالم."
 
     def export_state(self, filename: str) -> str:
+        # التصدير يقرأ من القاعدة، والدفعة المؤجلة قد تتأخر حتى
+        # SAVE_BATCH_INTERVAL_SEC — تفريغ أولاً كي لا تسقط آخر التعديلات
+        with self.lock:
+            self._flush_dirty()
+            self._last_flush = time.monotonic()
         fname = self.storage.export_all(filename)
         return f"تم التصدير إلى {fname}"
 
     def save_player(self) -> str:
-        self.storage.save_player(self.player.to_dict())
+        # الحفظ الصريح مزامنة كاملة: العوالم المؤجلة واللاعب في معاملة
+        # واحدة، وإلا انقسمت الحالة (مخزون محفوظ وعالم غير محفوظ) عند انهيار
+        with self.lock:
+            self._player_dirty = True
+            self._flush_dirty()
+            self._last_flush = time.monotonic()
         return "تم الحفظ."
 
     def develop_skill(self, skill_name: str) -> str:
-        skill_map = {
-            "ابتلاع": "ingestion_efficiency", 
-            "طاقة": "qi_mastery", 
-            "زراعة": "cultivation",
-            "قتال": "combat",
-            "بناء": "building",
-            "تجارة": "trading",
-            "جمع": "gathering",
-            "صنعة": "crafting"
-        }
-        norm_skill = normalize_ar_text(skill_name)
-        
-        target_skill = None
-        for k, v in skill_map.items():
-            if norm_skill == normalize_ar_text(k):
-                target_skill = v
-                break
-        
+        target_skill = _NORM_SKILL_MAP.get(normalize_ar_text(skill_name))
+
         if not target_skill or target_skill not in self.player.skills:
-            return f"مهارة غير معروفة. المهارات المتاحة: {', '.join(skill_map.keys())}"
+            return f"مهارة غير معروفة. المهارات المتاحة: {', '.join(SKILL_NAME_MAP.keys())}"
 
-        current_level = self.player.skills[target_skill]
-        cost = 50 * (1.8 ** current_level)
-        
-        if self.player.xp < cost:
-            return f"تحتاج إلى {cost:.1f} XP لتطوير هذه المهارة (لديك {self.player.xp:.1f} XP)."
-            
-        self.player.xp -= cost
-        self.player.skills[target_skill] += 1
-        self.storage.save_player(self.player.to_dict())
-        
-        return f"تم تطوير مهارة '{skill_name}' إلى المستوى {current_level + 1}!"
+        with self.lock:
+            current_level = self.player.skills[target_skill]
+            cost = 50 * (1.8 ** current_level)
+
+            if self.player.xp < cost:
+                return f"تحتاج إلى {cost:.1f} XP لتطوير هذه المهارة (لديك {self.player.xp:.1f} XP)."
+
+            self.player.xp -= cost
+            self.player.skills[target_skill] += 1
+            self._player_dirty = True
+
+            return f"تم تطوير مهارة '{skill_name}' إلى المستوى {current_level + 1}!"
 
     def craft_item(self, recipe_id: str) -> str:
         recipe = RECIPES.get(recipe_id)
         if not recipe:
             return "وصفة غير موجودة."
 
-        for item, required in recipe["ingredients"].items():
-            if self.player.inventory.get(item, 0) < required:
-                return f"لا تملك مكونات كافية. تحتاج إلى {required} من {item}."
-        
-        for item, required in recipe["ingredients"].items():
-            self.player.inventory[item] -= required
-            if self.player.inventory[item] == 0:
-                del self.player.inventory[item]
-        
-        for item, amount in recipe["output"].items():
-            self.player.inventory[item] = self.player.inventory.get(item, 0) + amount
-            
-        # خبرة مهارة البناء
-        xp_gained = self.skill_system.gain_skill_xp("crafting", "craft", 1.0)
-        level_up_msg = self.player.gain_skill_xp("crafting", xp_gained)
-            
-        # تحديث إحصائيات الصناعة
-        self.player.crafted_items_count += 1
-        if self.player.achievements.check_achievement("craft_master", 1):
-            self.player.gain_xp(150)
-            
-        self.storage.save_player(self.player.to_dict())
-        
-        result = f"نجحت في صناعة: {recipe['name']}."
-        if level_up_msg:
-            result += " " + level_up_msg
-        return result
+        with self.lock:
+            # اسم محلي للمخزون: يوفر بحث السمة في كل دورة
+            inv = self.player.inventory
+            ingredients = recipe["ingredients"]
+            missing = next(((item, req) for item, req in ingredients.items()
+                            if inv.get(item, 0) < req), None)
+            if missing:
+                return f"لا تملك مكونات كافية. تحتاج إلى {missing[1]} من {missing[0]}."
+
+            for item, required in ingredients.items():
+                inv[item] -= required
+                if inv[item] == 0:
+                    del inv[item]
+
+            for item, amount in recipe["output"].items():
+                inv[item] = inv.get(item, 0) + amount
+
+            # خبرة مهارة البناء
+            xp_gained = self.skill_system.gain_skill_xp("crafting", "craft", 1.0)
+            level_up_msg = self.player.gain_skill_xp("crafting", xp_gained)
+
+            # تحديث إحصائيات الصناعة
+            self.player.crafted_items_count += 1
+            if self.player.achievements.check_achievement("craft_master", 1):
+                self.player.gain_xp(150)
+
+            self._player_dirty = True
+
+            result = f"نجحت في صناعة: {recipe['name']}."
+            if level_up_msg:
+                result += " " + level_up_msg
+            return result
 
     def build_structure(self, structure_id: str) -> str:
         if structure_id not in BUILDINGS:
             return "هذا الهيكل غير معروف."
-            
+
         building_data = BUILDINGS[structure_id]
         cost = building_data.get("cost", {})
-        
-        # التحقق من الموارد
-        for resource, amount in cost.items():
-            if self.player.inventory.get(resource, 0) < amount:
-                return f"تحتاج إلى {amount} من {resource} لبناء هذا الهيكل."
-        
-        # استهلاك الموارد
-        for resource, amount in cost.items():
-            self.player.inventory[resource] -= amount
-            if self.player.inventory[resource] <= 0:
-                del self.player.inventory[resource]
-        
-        # بناء الهيكل
-        self.player.inner.buildings.buildings[structure_id] = \
-            self.player.inner.buildings.buildings.get(structure_id, 0) + 1
-        
-        # خبرة البناء
-        xp_gained = self.skill_system.gain_skill_xp("building", "build", 1.0)
-        level_up_msg = self.player.gain_skill_xp("building", xp_gained)
-        
-        # تحقيق إنجاز إذا كان أول بناء
-        if self.player.achievements.check_achievement("settlement_founder"):
-            self.player.gain_xp(200)
-            
-        self.storage.save_player(self.player.to_dict())
-        
-        result = f"تم بناء {building_data['name']} بنجاح!"
-        if level_up_msg:
-            result += " " + level_up_msg
-        return result
+
+        with self.lock:
+            # التحقق من الموارد ثم استهلاكها عبر اسم محلي واحد
+            inv = self.player.inventory
+            missing = next(((r, a) for r, a in cost.items() if inv.get(r, 0) < a), None)
+            if missing:
+                return f"تحتاج إلى {missing[1]} من {missing[0]} لبناء هذا الهيكل."
+
+            for resource, amount in cost.items():
+                inv[resource] -= amount
+                if inv[resource] <= 0:
+                    del inv[resource]
+
+            # بناء الهيكل
+            self.player.inner.buildings.buildings[structure_id] = \
+                self.player.inner.buildings.buildings.get(structure_id, 0) + 1
+
+            # خبرة البناء
+            xp_gained = self.skill_system.gain_skill_xp("building", "build", 1.0)
+            level_up_msg = self.player.gain_skill_xp("building", xp_gained)
+
+            # تحقيق إنجاز إذا كان أول بناء
+            if self.player.achievements.check_achievement("settlement_founder"):
+                self.player.gain_xp(200)
+
+            self._player_dirty = True
+
+            result = f"تم بناء {building_data['name']} بنجاح!"
+            if level_up_msg:
+                result += " " + level_up_msg
+            return result
 
     def create_settlement(self, name: str) -> str:
-        if any(s.name == name for s in self.player.inner.settlements):
-            return "هناك مستوطنة بنفس الاسم بالفعل."
-            
-        # تكلفة إنشاء مستوطنة
-        settlement_cost = {"wood": 50, "stone": 30, "herb_common": 100}
-        for resource, amount in settlement_cost.items():
-            if self.player.inventory.get(resource, 0) < amount:
-                return f"تحتاج إلى {amount} من {resource} لإنشاء مستوطنة."
-        
-        # استهلاك الموارد
-        for resource, amount in settlement_cost.items():
-            self.player.inventory[resource] -= amount
-            if self.player.inventory[resource] <= 0:
-                del self.player.inventory[resource]
-        
-        # إنشاء المستوطنة
-        new_settlement = HumanSettlement(name, 10)
-        self.player.inner.settlements.append(new_settlement)
-        
-        # تحديث إنجاز حاكم المستوطنات
-        if self.player.achievements.check_achievement("settlement_ruler", 1):
-            self.player.gain_xp(300)
-        
-        self.storage.save_player(self.player.to_dict())
-        return f"تم إنشاء مستوطنة {name} بنجاح!"
+        with self.lock:
+            if any(s.name == name for s in self.player.inner.settlements):
+                return "هناك مستوطنة بنفس الاسم بالفعل."
+
+            # تكلفة إنشاء مستوطنة
+            settlement_cost = {"wood": 50, "stone": 30, "herb_common": 100}
+            for resource, amount in settlement_cost.items():
+                if self.player.inventory.get(resource, 0) < amount:
+                    return f"تحتاج إلى {amount} من {resource} لإنشاء مستوطنة."
+
+            # استهلاك الموارد
+            for resource, amount in settlement_cost.items():
+                self.player.inventory[resource] -= amount
+                if self.player.inventory[resource] <= 0:
+                    del self.player.inventory[resource]
+
+            # إنشاء المستوطنة
+            new_settlement = HumanSettlement(name, 10)
+            self.player.inner.settlements.append(new_settlement)
+            self._settlement_loc[name] = ""
+
+            # تحديث إنجاز حاكم المستوطنات
+            if self.player.achievements.check_achievement("settlement_ruler", 1):
+                self.player.gain_xp(300)
+
+            self._player_dirty = True
+            return f"تم إنشاء مستوطنة {name} بنجاح!"
 
     def list_settlements(self) -> str:
         """عرض جميع المستوطنات"""
-        output = ["🏘️ مستوطناتك الداخلية:"]
-        settlements = self.player.inner.settlements
-        if settlements:
-            for i, settlement in enumerate(settlements):
-                output.append(f"{i+1}. {settlement.name} - {settlement.population} سكان")
-        else:
-            output.append("لا توجد مستوطنات في عالمك الداخلي")
-            
-        # المستوطنات في العوالم الخارجية
-        world_settlements = []
-        for wid in self.storage.list_worlds():
+        with self.lock:
+            output = ["🏘️ مستوطناتك الداخلية:"]
+            settlements = self.player.inner.settlements
+            if settlements:
+                for i, settlement in enumerate(settlements):
+                    output.append(f"{i+1}. {settlement.name} - {settlement.population} سكان")
+            else:
+                output.append("لا توجد مستوطنات في عالمك الداخلي")
+
+            # المستوطنات في العوالم الخارجية
+            world_settlements = []
+            for wid in self._all_world_ids:
+                w = self._get_cached_world(wid)
+                if w and w.settlements:
+                    for settlement in w.settlements:
+                        world_settlements.append(f"{settlement.name} في {w.name}")
+
+            if world_settlements:
+                output.append("\n🏘️ المستوطنات في العوالم الخارجية:")
+                for settlement in world_settlements:
+                    output.append(f"- {settlement}")
+
+            return "\n".join(output)
+
+    def _find_settlement(self, name: str) -> Tuple[Optional[HumanSettlement], Optional[World]]:
+        """مستوطنة باسمها: الفهرس أولاً، والمسح الكامل عند الفقدان فقط"""
+        loc = self._settlement_loc.get(name)
+        if loc is not None:
+            if loc == "":
+                for s in self.player.inner.settlements:
+                    if s.name == name:
+                        return s, None
+            else:
+                w = self._get_cached_world(loc)
+                if w:
+                    for s in w.settlements:
+                        if s.name == name:
+                            return s, w
+            del self._settlement_loc[name]  # مدخل قديم
+
+        for s in self.player.inner.settlements:
+            if s.name == name:
+                self._settlement_loc[name] = ""
+                return s, None
+        for wid in self._all_world_ids:
             w = self._get_cached_world(wid)
-            if w and w.settlements:
-                for settlement in w.settlements:
-                    world_settlements.append(f"{settlement.name} في {w.name}")
-        
-        if world_settlements:
-            output.append("\n🏘️ المستوطنات في العوالم الخارجية:")
-            for settlement in world_settlements:
-                output.append(f"- {settlement}")
-        
-        return "\n".join(output)
+            if not w: continue
+            for s in w.settlements:
+                if s.name == name:
+                    self._settlement_loc[name] = wid
+                    return s, w
+        return None, None
 
     def show_settlement(self, settlement_name: str) -> str:
         """عرض معلومات مستوطنة"""
-        # البحث في المستوطنات الداخلية
-        for settlement in self.player.inner.settlements:
-            if settlement.name == settlement_name:
-                return settlement.get_info()
-        
-        # البحث في المستوطنات الخارجية
-        for wid in self.storage.list_worlds():
-            w = self._get_cached_world(wid)
-            if w:
-                for settlement in w.settlements:
-                    if settlement.name == settlement_name:
-                        info = settlement.get_info()
-                        info += f"\n📍 الموقع: {w.name}"
-                        return info
-        
-        return "المستوطنة غير موجودة"
+        with self.lock:
+            settlement, w = self._find_settlement(settlement_name)
+            if settlement is None:
+                return _ERR_NO_SETTLEMENT
+            info = settlement.get_info()
+            if w is not None:
+                info += f"\n📍 الموقع: {w.name}"
+            return info
 
     def collect_settlement_resources(self, settlement_name: str, resource: str = None, amount: int = None) -> str:
         """جمع موارد من مستوطنة"""
-        # البحث عن المستوطنة
-        settlement = None
-        # البحث في الداخل أولاً
-        for s in self.player.inner.settlements:
-            if s.name == settlement_name:
-                settlement = s
-                break
-        
-        # البحث في الخارج إذا لم تُوجد في الداخل
-        if not settlement:
-            for wid in self.storage.list_worlds():
-                w = self._get_cached_world(wid)
-                if w:
-                    for s in w.settlements:
-                        if s.name == settlement_name:
-                            settlement = s
-                            break
-                if settlement:
-                    break
-        
-        if settlement:
-            collected = settlement.collect_resources(resource, amount)
-            if collected:
-                # إضافة الموارد إلى مخزون اللاعب
-                for res, amt in collected.items():
-                    self.player.inventory[res] = self.player.inventory.get(res, 0) + amt
-                
-                output = [f"جمعت من {settlement_name}:"]
-                for res, amt in collected.items():
-                    res_name = BLOCKS.get(res, {}).get('name', res)
-                    output.append(f"- {res_name}: {amt}")
-                
-                self.storage.save_player(self.player.to_dict())
-                return "\n".join(output)
+        with self.lock:
+            settlement, _ = self._find_settlement(settlement_name)
+
+            if settlement:
+                collected = settlement.collect_resources(resource, amount)
+                if collected:
+                    # إضافة الموارد إلى مخزون اللاعب
+                    for res, amt in collected.items():
+                        self.player.inventory[res] += amt
+
+                    output = [f"جمعت من {settlement_name}:"]
+                    for res, amt in collected.items():
+                        res_name = block_name(res)
+                        output.append(f"- {res_name}: {amt}")
+
+                    self._player_dirty = True
+                    return "\n".join(output)
+                else:
+                    return "لم يتم جمع أي موارد"
             else:
-                return "لم يتم جمع أي موارد"
-        else:
-            return "المستوطنة غير موجودة"
+                return _ERR_NO_SETTLEMENT
 
     def build_in_settlement(self, settlement_name: str, building_id: str) -> str:
-        """بناء مبنى في مستوطنة"""
-        settlement = None
-        # البحث في المستوطنات الداخلية
-        for s in self.player.inner.settlements:
-            if s.name == settlement_name:
-                settlement = s
-                break
-        
-        if settlement and building_id in BUILDINGS:
-            cost = BUILDINGS[building_id].get("cost", {})
-            
-            # التحقق من الموارد
-            can_build = True
-            for res, amt in cost.items():
-                if settlement.resources.get(res, 0) < amt:
-                    return f"تحتاج إلى {amt} من {res}"
-                    can_build = False
-                    break
-            
-            if can_build:
-                # خصم الموارد
+        """بناء مبنى في مستوطنة (الداخلية فقط)"""
+        with self.lock:
+            settlement, in_world = self._find_settlement(settlement_name)
+            if in_world is not None:
+                settlement = None
+
+            if settlement and building_id in BUILDINGS:
+                cost = BUILDINGS[building_id].get("cost", {})
+
+                # التحقق من الموارد ثم خصمها في مسار واحد
+                res_dict = settlement.resources
+                missing = next(((r, a) for r, a in cost.items()
+                                if res_dict.get(r, 0) < a), None)
+                if missing:
+                    return f"تحتاج إلى {missing[1]} من {missing[0]}"
+
                 for res, amt in cost.items():
-                    settlement.resources[res] -= amt
-                
+                    res_dict[res] -= amt
+
                 # بناء المبنى
                 settlement.buildings[building_id] = settlement.buildings.get(building_id, 0) + 1
                 building_name = BUILDINGS[building_id].get("name", building_id)
-                
-                self.storage.save_player(self.player.to_dict())
+
+                self._player_dirty = True
                 return f"تم بناء {building_name} في {settlement_name}"
-        else:
-            return "المستوطنة أو المبنى غير موجود"
+            else:
+                return "المستوطنة أو المبنى غير موجود"
 
     def assign_profession(self, settlement_name: str, profession: str, count: int) -> str:
-        """تعيين مهنة للمستوطنين"""
-        settlement = None
-        # البحث في المستوطنات الداخلية
-        for s in self.player.inner.settlements:
-            if s.name == settlement_name:
-                settlement = s
-                break
-        
-        if settlement:
-            result = settlement.assign_profession(profession, count)
-            self.storage.save_player(self.player.to_dict())
-            return result
-        else:
-            return "المستوطنة غير موجودة"
+        """تعيين مهنة للمستوطنين (المستوطنات الداخلية فقط)"""
+        with self.lock:
+            settlement, in_world = self._find_settlement(settlement_name)
+            if in_world is not None:
+                settlement = None
+
+            if settlement:
+                result = settlement.assign_profession(profession, count)
+                self._player_dirty = True
+                return result
+            else:
+                return _ERR_NO_SETTLEMENT
 
     def ingest_settlement_creatures(self, settlement_name: str, max_creatures: int = None) -> str:
         """ابتلاع مخلوقات من مستوطنة"""
-        settlement = None
-        world = None
-        
-        # البحث عن المستوطنة
-        for wid in self.storage.list_worlds():
-            w = self._get_cached_world(wid)
-            if w and w.settlements:
-                for s in w.settlements:
-                    if s.name == settlement_name:
-                        settlement = s
-                        world = w
-                        break
-            if settlement:
-                break
-        
-        if not settlement:
-            return "المستوطنة غير موجودة في أي عالم"
-        
-        # المخلوقات في عالم المستوطنة
-        creatures_to_ingest = []
-        for creature in world.creatures:
-            # يمكن ابتلاع المخلوقات القريبة من المستوطنة
-            if random.random() < 0.7:  # 70% chance
-                creatures_to_ingest.append(creature)
-        
-        if not creatures_to_ingest:
-            return "لا توجد مخلوقات قريبة من المستوطنة"
-        
-        if max_creatures:
-            creatures_to_ingest = creatures_to_ingest[:max_creatures]
-        
-        ingested_count = 0
-        for creature in creatures_to_ingest:
-            if creature in world.creatures:
+        with self.lock:
+            settlement, world = self._find_settlement(settlement_name)
+            if not settlement or world is None:
+                return "المستوطنة غير موجودة في أي عالم"
+
+            # المخلوقات في عالم المستوطنة
+            creatures_to_ingest = []
+            for creature in world.creatures:
+                # يمكن ابتلاع المخلوقات القريبة من المستوطنة
+                if random.random() < 0.7:  # 70% chance
+                    creatures_to_ingest.append(creature)
+
+            if not creatures_to_ingest:
+                return "لا توجد مخلوقات قريبة من المستوطنة"
+
+            if max_creatures:
+                creatures_to_ingest = creatures_to_ingest[:max_creatures]
+
+            # الابتلاع يجمع الهويات أولاً ثم يرشّح القائمة بمسح واحد
+            # بدل فحص عضوية + remove خطيين لكل مخلوق
+            ingested_ids = set()
+            for creature in creatures_to_ingest:
                 spec = CREATURES.get(creature.spec_id)
                 if spec:
                     cost_cubes = max(1, int(spec["energy_max"] * 0.04))
                     if self.player.inner.size_cubes + cost_cubes <= self.player.inner.capacity_cubes:
                         inner_cre = CreatureInstance(
-                            creature.uid, creature.spec_id, 
-                            min(creature.energy, spec["energy_max"] * 0.6), 
+                            creature.uid, creature.spec_id,
+                            min(creature.energy, spec["energy_max"] * 0.6),
                             creature.age
                         )
                         self.player.inner.creatures.append(inner_cre)
                         self.player.inner.size_cubes += cost_cubes
-                        world.creatures.remove(creature)
-                        ingested_count += 1
-        
-        if ingested_count > 0:
-            self.storage.save_world(world)
-            self.storage.save_player(self.player.to_dict())
-            return f"ابتلعت {ingested_count} مخلوقات من حول مستوطنة {settlement_name}"
-        else:
-            return "لم تتمكن من ابتلاع أي مخلوقات"
+                        ingested_ids.add(id(creature))
+            ingested_count = len(ingested_ids)
+
+            if ingested_count > 0:
+                world.creatures = [c for c in world.creatures if id(c) not in ingested_ids]
+                world._creatures_version += 1
+                self._mark_world_dirty(world)
+                self._player_dirty = True
+                return f"ابتلعت {ingested_count} مخلوقات من حول مستوطنة {settlement_name}"
+            else:
+                return "لم تتمكن من ابتلاع أي مخلوقات"
 
     def trade_item(self, action: str, item_id: str, quantity: int = 1) -> str:
         """تجارة عنصر مع السوق العالمي"""
@@ -2208,87 +2694,87 @@ class Engine:
             return "استخدم 'شراء' أو 'بيع'"
         
         is_buying = (action == "شراء")
-        
-        if is_buying:
-            # الشراء: التحقق من العملات
-            success, total_cost = self.player.economy.execute_trade(
-                item_id, quantity, is_buying, self.player.skills.get("trading", 1)
-            )
-            if not success:
-                return f"لا تملك عملات كافية. التكلفة: {total_cost}"
-            
-            # إضافة العنصر للمخزون
-            self.player.inventory[item_id] = self.player.inventory.get(item_id, 0) + quantity
-            result = f"اشتريت {quantity} من {item_id} بسعر {total_cost} عملة"
-        else:
-            # البيع: التحقق من المخزون
-            if self.player.inventory.get(item_id, 0) < quantity:
-                return f"لا تملك {quantity} من {item_id}"
-            
-            success, total_income = self.player.economy.execute_trade(
-                item_id, quantity, is_buying, self.player.skills.get("trading", 1)
-            )
-            
-            # إزالة العنصر من المخزون
-            self.player.inventory[item_id] -= quantity
-            if self.player.inventory[item_id] <= 0:
-                del self.player.inventory[item_id]
-            
-            result = f"بعت {quantity} من {item_id} بسعر {total_income} عملة"
-        
-        # خبرة مهارة التجارة
-        xp_gained = self.skill_system.gain_skill_xp("trading", "trade", quantity)
-        level_up_msg = self.player.gain_skill_xp("trading", xp_gained)
-        
-        # تحديث إحصائيات التجارة
-        self.player.achievements.check_achievement("trade_master", 1)
-        
-        self.storage.save_player(self.player.to_dict())
-        
-        if level_up_msg:
-            result += " " + level_up_msg
-        return result
+
+        with self.lock:
+            if is_buying:
+                # الشراء: التحقق من العملات
+                success, total_cost = self.player.economy.execute_trade(
+                    item_id, quantity, is_buying, self.player.skills.get("trading", 1)
+                )
+                if not success:
+                    return f"لا تملك عملات كافية. التكلفة: {total_cost}"
+
+                # إضافة العنصر للمخزون
+                self.player.inventory[item_id] += quantity
+                result = f"اشتريت {quantity} من {item_id} بسعر {total_cost} عملة"
+            else:
+                # البيع: التحقق من المخزون
+                if self.player.inventory.get(item_id, 0) < quantity:
+                    return f"لا تملك {quantity} من {item_id}"
+
+                success, total_income = self.player.economy.execute_trade(
+                    item_id, quantity, is_buying, self.player.skills.get("trading", 1)
+                )
+
+                # إزالة العنصر من المخزون
+                self.player.inventory[item_id] -= quantity
+                if self.player.inventory[item_id] <= 0:
+                    del self.player.inventory[item_id]
+
+                result = f"بعت {quantity} من {item_id} بسعر {total_income} عملة"
+
+            # خبرة مهارة التجارة
+            xp_gained = self.skill_system.gain_skill_xp("trading", "trade", quantity)
+            level_up_msg = self.player.gain_skill_xp("trading", xp_gained)
+
+            # تحديث إحصائيات التجارة
+            self.player.achievements.check_achievement("trade_master", 1)
+
+            self._player_dirty = True
+
+            if level_up_msg:
+                result += " " + level_up_msg
+            return result
 
     def show_skills(self) -> str:
         """عرض المهارات بشكل مفصل"""
         output = ["🎯 مهاراتك الحالية:"]
-        
+
         for skill_name, level in self.player.skills.items():
             skill_effect = self.skill_system.get_skill_effect(skill_name, level)
             xp_progress = self.player.skill_experience.get(skill_name, 0)
             xp_needed = level * 100
-            
+
             skill_display_name = self.player.get_skill_name(skill_name)
-            output.append(
-                f"• {skill_display_name}: المستوى {level} "
-                f"({xp_progress:.1f}/{xp_needed} XP)"
-            )
-            
-            # عرض تأثيرات المهارة
+            line = (f"• {skill_display_name}: المستوى {level} "
+                    f"({xp_progress:.1f}/{xp_needed} XP)")
+            # تأثيرات المهارة تلحق بسطر المهارة نفسه بدل append لكل تأثير
             if skill_effect:
-                for effect, value in skill_effect.items():
-                    effect_name = self._get_effect_name(effect)
-                    output.append(f"  ↳ {effect_name}: {value}")
-        
+                line += "".join(f"\n  ↳ {self._get_effect_name(effect)}: {value}"
+                                for effect, value in skill_effect.items())
+            output.append(line)
+
         return "\n".join(output)
 
+    # يبنى مرة واحدة على مستوى الصنف بدل إعادة البناء في كل استدعاء
+    _EFFECT_NAMES = {
+        "capacity_bonus": "زيادة السعة",
+        "efficiency": "الكفاءة",
+        "qi_cost_reduction": "تقليل تكلفة الطاقة",
+        "generation_boost": "تعزيز التوليد",
+        "growth_boost": "تعزيز النمو",
+        "yield_bonus": "زيادة المحصول",
+        "attack_bonus": "تعزيز الهجوم",
+        "defense_bonus": "تعزيز الدفاع",
+        "build_speed": "سرعة البناء",
+        "cost_reduction": "تقليل التكلفة",
+        "price_advantage": "ميزة السعر",
+        "bargaining": "المساومة"
+    }
+
     def _get_effect_name(self, effect_key: str) -> str:
         """ترجمة مفاتيح التأثيرات إلى أسماء عربية"""
-        effect_names = {
-            "capacity_bonus": "زيادة السعة",
-            "efficiency": "الكفاءة",
-            "qi_cost_reduction": "تقليل تكلفة الطاقة",
-            "generation_boost": "تعزيز التوليد",
-            "growth_boost": "تعزيز النمو",
-            "yield_bonus": "زيادة المحصول",
-            "attack_bonus": "تعزيز الهجوم",
-            "defense_bonus": "تعزيز الدفاع",
-            "build_speed": "سرعة البناء",
-            "cost_reduction": "تقليل التكلفة",
-            "price_advantage": "ميزة السعر",
-            "bargaining": "المساومة"
-        }
-        return effect_names.get(effect_key, effect_key)
+        return self._EFFECT_NAMES.get(effect_key, effect_key)
 
     def show_professions(self) -> str:
         """عرض المهن المتاحة"""
@@ -2318,30 +2804,31 @@ class Engine:
 
     def check_production(self, settlement_name: str) -> str:
         """عرض إنتاج المستوطنة"""
-        settlement = None
-        # البحث في المستوطنات الداخلية
-        for s in self.player.inner.settlements:
-            if s.name == settlement_name:
-                settlement = s
-                break
-        
-        if not settlement:
-            return "المستوطنة غير موجودة."
-        
-        production = settlement.get_production()
-        output = [f"🏭 إنتاج مستوطنة {settlement_name}:"]
-        
-        if production:
-            for item, amount in production.items():
-                item_name = BLOCKS.get(item, {}).get('name', item) or item
-                output.append(f"  {item_name}: {amount}")
-        else:
-            output.append("لا يوجد إنتاج حالياً.")
-        
-        output.append(f"\nالمهن المعينة: {', '.join([f'{k}({v})' for k, v in settlement.professions.items()])}")
-        output.append(f"إجمالي السكان: {settlement.population}")
-        
-        return "\n".join(output)
+        with self.lock:
+            settlement = None
+            # البحث في المستوطنات الداخلية
+            for s in self.player.inner.settlements:
+                if s.name == settlement_name:
+                    settlement = s
+                    break
+
+            if not settlement:
+                return "المستوطنة غير موجودة."
+
+            production = settlement.get_production()
+            output = [f"🏭 إنتاج مستوطنة {settlement_name}:"]
+
+            if production:
+                for item, amount in production.items():
+                    item_name = block_name(item) or item
+                    output.append(f"  {item_name}: {amount}")
+            else:
+                output.append("لا يوجد إنتاج حالياً.")
+
+            output.append(f"\nالمهن المعينة: {', '.join([f'{k}({v})' for k, v in settlement.professions.items()])}")
+            output.append(f"إجمالي السكان: {settlement.population}")
+
+            return "\n".join(output)
 
     def train_skill(self, skill_name: str, hours: int) -> str:
         """تدريب مهارة معينة"""
@@ -2350,104 +2837,116 @@ class Engine:
         
         if hours <= 0:
             return "عدد الساعات يجب أن يكون موجباً."
-        
-        # حساب خبرة التدريب
-        xp_gained = hours * 20.0  # 2 XP لكل ساعة تدريب
-        level_up_msg = self.player.gain_skill_xp(skill_name, xp_gained)
-        
-        # استهلاك الطاقة أثناء التدريب
-        energy_cost = hours * 0.2
-        self.player.qi = max(0, self.player.qi - energy_cost)
-        
-        result = f"تدربت على {self.player.get_skill_name(skill_name)} لمدة {hours} ساعات."
-        if level_up_msg:
-            result += " " + level_up_msg
-        
-        self.storage.save_player(self.player.to_dict())
-        return result
 
-    def apply_element_relationships(self, world: World) -> List[str]:
+        with self.lock:
+            # حساب خبرة التدريب
+            xp_gained = hours * 20.0  # 2 XP لكل ساعة تدريب
+            level_up_msg = self.player.gain_skill_xp(skill_name, xp_gained)
+
+            # استهلاك الطاقة أثناء التدريب
+            energy_cost = hours * 0.2
+            self.player.qi = max(0, self.player.qi - energy_cost)
+
+            result = f"تدربت على {self.player.get_skill_name(skill_name)} لمدة {hours} ساعات."
+            if level_up_msg:
+                result += " " + level_up_msg
+
+            self._player_dirty = True
+            return result
+
+    def apply_element_relationships(self, world: World, verbose: bool = True) -> List[str]:
         """تطبيق العلاقات بين العناصر في العالم"""
-        messages = []
-        
-        # إنشاء نسخة من العناصر لتجنب تغيير القاموس أثناء التكرار
-        elements_copy = world.elements.copy()
-        
-        for element_id, count in elements_copy.items():
-            if element_id in ELEMENT_RELATIONSHIPS:
-                relations = ELEMENT_RELATIONSHIPS[element_id]
-                
-                # التحقق من المتطلبات للنمو
-                if "requires" in relations:
-                    has_requirements = all(req in world.elements for req in relations["requires"])
-                    if has_requirements and "growth_rate" in relations:
-                        growth = relations["growth_rate"] * world.regen_rate_scalar
-                        new_count = int(count * (1 + growth))
-                        if new_count > count:
-                            world.elements[element_id] = new_count
-                            messages.append(f"{element_id} نما من {count} إلى {new_count}")
-                
-                # الإنتاج التلقائي
-                if "produces" in relations and random.random() < 0.1:
-                    for product in relations["produces"]:
-                        world.elements[product] = world.elements.get(product, 0) + 1
+        messages = [] if verbose else _NO_MSGS
+        elements = world.elements
+        rand = random.random
+        regen = world.regen_rate_scalar
+
+        # النمو المشروط بالمتطلبات
+        for element_id, requires, growth_rate in _REL_GROWTH:
+            count = elements.get(element_id, 0)
+            if count and all(req in elements for req in requires):
+                new_count = int(count * (1 + growth_rate * regen))
+                if new_count > ELEMENT_MAX:
+                    new_count = ELEMENT_MAX
+                if new_count > count:
+                    elements[element_id] = new_count
+                    if verbose:
+                        messages.append(f"{element_id} نما من {count} إلى {new_count}")
+
+        # الإنتاج التلقائي
+        for element_id, products in _REL_PRODUCES:
+            if element_id in elements and rand() < 0.1:
+                for product in products:
+                    elements[product] += 1
+                    if verbose:
                         messages.append(f"{element_id} أنتج {product}")
-                
-                # التحلل
-                if "decays_to" in relations and random.random() < 0.05:
-                    decay_product = relations["decays_to"]
-                    decay_amount = max(1, int(count * 0.1))
-                    if world.elements.get(element_id, 0) >= decay_amount:
-                        world.elements[element_id] -= decay_amount
-                        world.elements[decay_product] = world.elements.get(decay_product, 0) + decay_amount
-                        if world.elements[element_id] <= 0:
-                            del world.elements[element_id]
+
+        # التحلل
+        for element_id, decay_product in _REL_DECAYS:
+            count = elements.get(element_id, 0)
+            if count and rand() < 0.05:
+                decay_amount = max(1, int(count * 0.1))
+                if count >= decay_amount:
+                    elements[element_id] = count - decay_amount
+                    # ناتج التحلل يخضع للسقف نفسه: عنصر محسوم عند السقف
+                    # يضخ دفعات هائلة تتراكم في ناتجه بلا حد
+                    new_total = elements[decay_product] + decay_amount
+                    elements[decay_product] = new_total if new_total <= ELEMENT_MAX else ELEMENT_MAX
+                    if elements[element_id] <= 0:
+                        del elements[element_id]
+                    if verbose:
                         messages.append(f"{decay_amount} من {element_id} تحللت إلى {decay_product}")
-        
+
         return messages
 
-    def handle_predation_and_resources(self, world: World) -> List[str]:
+    def handle_predation_and_resources(self, world: World, verbose: bool = True) -> List[str]:
         """معالجة الافتراس وإضافة الموارد من الجثث"""
-        messages = []
+        messages = [] if verbose else _NO_MSGS
         creatures_to_remove = []
-        
+        rand = random.random  # ربط محلي لحلقة المفترسات
+
         for predator in world.creatures:
-            spec = CREATURES.get(predator.spec_id)
-            if not spec or spec["diet"] != "carnivore":
+            if predator.spec_id not in _ACTIVE_PREDATORS:
                 continue
-                
-            if predator.spec_id in PREDATION:
-                potential_prey = [c for c in world.creatures if c.spec_id in PREDATION[predator.spec_id] and c.uid != predator.uid]
-                if potential_prey and random.random() < 0.15:
+
+            # رمية الاحتمال أولاً: لا داعي لبناء قائمة الفرائس في 85% من الدورات
+            if rand() < 0.15:
+                prey_set = _PREY_SETS[predator.spec_id]
+                potential_prey = [c for c in world.creatures if c.spec_id in prey_set and c.uid != predator.uid]
+                if potential_prey:
+                    spec = CREATURES[predator.spec_id]
                     prey = random.choice(potential_prey)
                     damage = spec["attack"] * random.uniform(0.5, 1.4)
                     prey.energy -= damage
                     
                     # نقل الطاقة
                     energy_gain = damage * 0.6
-                    predator.energy = min(spec["energy_max"], predator.energy + energy_gain)
+                    predator.energy = min(_SPEC_ENERGY_MAX[predator.spec_id], predator.energy + energy_gain)
                     
-                    messages.append(f"{spec['name']} هاجم {CREATURES[prey.spec_id]['name']} وتسبب في {damage:.1f} ضرر")
+                    if verbose:
+                        messages.append(f"{spec['name']} هاجم {CREATURES[prey.spec_id]['name']} وتسبب في {damage:.1f} ضرر")
                     
                     if prey.energy <= 0:
                         # إضافة موارد من الجثة
-                        world.elements["corpse"] = world.elements.get("corpse", 0) + 1
-                        world.elements["bones"] = world.elements.get("bones", 0) + 1
-                        world.elements[f"essence_{prey.spec_id}"] = world.elements.get(f"essence_{prey.spec_id}", 0) + 1
+                        world.elements["corpse"] += 1
+                        world.elements["bones"] += 1
+                        world.elements[f"essence_{prey.spec_id}"] += 1
                         
                         creatures_to_remove.append(prey)
-                        messages.append(f"{CREATURES[prey.spec_id]['name']} مات وأضاف موارد للعالم")
+                        if verbose:
+                            messages.append(f"{CREATURES[prey.spec_id]['name']} مات وأضاف موارد للعالم")
         
-        # إزالة المخلوقات الميتة
-        for creature in creatures_to_remove:
-            if creature in world.creatures:
-                world.creatures.remove(creature)
+        # إزالة المخلوقات الميتة بمسح واحد بدل remove لكل مخلوق
+        if creatures_to_remove:
+            dead = {id(c) for c in creatures_to_remove}
+            world.creatures = [c for c in world.creatures if id(c) not in dead]
+            world._creatures_version += 1
         
         return messages
 
-    def decomposition_system(self, world: World) -> List[str]:
+    def decomposition_system(self, world: World, verbose: bool = True) -> List[str]:
         """نظام التحلل للجثث والموارد"""
-        messages = []
+        messages = [] if verbose else _NO_MSGS
         
         # تحلل الجثث
         if "corpse" in world.elements and world.elements["corpse"] > 0:
@@ -2455,220 +2954,268 @@ class Engine:
             decayed = int(world.elements["corpse"] * decay_rate)
             if decayed > 0:
                 world.elements["corpse"] -= decayed
-                world.elements["dirt"] = world.elements.get("dirt", 0) + int(decayed * 0.7)
-                world.elements["bones"] = world.elements.get("bones", 0) + int(decayed * 0.3)
+                world.elements["dirt"] += int(decayed * 0.7)
+                world.elements["bones"] += int(decayed * 0.3)
                 
                 if world.elements["corpse"] <= 0:
                     del world.elements["corpse"]
-                
-                messages.append(f"{decayed} جثة تحللت إلى تربة وعظام")
-        
-        # تحلل العناصر
-        elements_copy = world.elements.copy()
-        for element_id in elements_copy:
-            if element_id in ELEMENT_RELATIONSHIPS and "decays_to" in ELEMENT_RELATIONSHIPS[element_id]:
-                decay_chance = 0.05 * world.regen_rate_scalar
-                if random.random() < decay_chance and world.elements.get(element_id, 0) > 0:
-                    decay_product = ELEMENT_RELATIONSHIPS[element_id]["decays_to"]
-                    decay_amount = max(1, int(world.elements[element_id] * 0.1))
-                    if world.elements[element_id] >= decay_amount:
-                        world.elements[element_id] -= decay_amount
-                        world.elements[decay_product] = world.elements.get(decay_product, 0) + decay_amount
-                        
-                        if world.elements[element_id] <= 0:
-                            del world.elements[element_id]
-                        
+
+                if verbose:
+                    messages.append(f"{decayed} جثة تحللت إلى تربة وعظام")
+        
+        # تحلل العناصر: جدول التحلل الثابت بدل نسخ قاموس العناصر
+        elements = world.elements
+        decay_chance = 0.05 * world.regen_rate_scalar
+        rand = random.random
+        for element_id, decay_product in _REL_DECAYS:
+            count = elements.get(element_id, 0)
+            if count > 0 and rand() < decay_chance:
+                decay_amount = max(1, int(count * 0.1))
+                if count >= decay_amount:
+                    elements[element_id] = count - decay_amount
+                    new_total = elements[decay_product] + decay_amount
+                    elements[decay_product] = new_total if new_total <= ELEMENT_MAX else ELEMENT_MAX
+
+                    if elements[element_id] <= 0:
+                        del elements[element_id]
+
+                    if verbose:
                         messages.append(f"{decay_amount} من {element_id} تحللت إلى {decay_product}")
-        
+
         return messages
 
-    def enhanced_reproduction(self, world: World) -> List[str]:
+    def enhanced_reproduction(self, world: World, verbose: bool = True,
+                              now: Optional[float] = None) -> List[str]:
         """نظام تكاثر محسن بشروط واقعية"""
-        messages = []
+        messages = [] if verbose else _NO_MSGS
         newborns = []
-        
+        # ثوابت الحلقة وربط محلي للدوال الساخنة: استدعاء واحد بدل واحد لكل مخلوق
+        if now is None:
+            now = time.time()
+        rand = random.random
+        base_count = len(world.creatures)
+        cap = world.carrying_capacity * 0.8
+        regen = world.regen_rate_scalar
+
+        energy_max = _SPEC_ENERGY_MAX
+        repro = _SPEC_REPRO
+
         for creature in world.creatures:
-            spec = CREATURES.get(creature.spec_id)
-            if not spec:
+            sid = creature.spec_id
+            if sid not in repro:
                 continue
-                
+
             # شروط التكاثر
             can_reproduce = (
-                creature.energy > spec["energy_max"] * 0.7 and
-                time.time() - creature.last_breed > 3600 and
-                len(world.creatures) + len(newborns) < world.carrying_capacity * 0.8 and
-                random.random() < spec["repro"] * world.regen_rate_scalar
+                creature.energy > energy_max[sid] * 0.7 and
+                now - creature.last_breed > 3600 and
+                base_count + len(newborns) < cap and
+                rand() < repro[sid] * regen
             )
-            
+
             if can_reproduce:
                 # خسارة الطاقة للتكاثر
                 creature.energy *= 0.8
-                creature.last_breed = time.time()
-                
+                creature.last_breed = now
+
                 # إنتاج نسل
-                baby_energy = spec["energy_max"] * random.uniform(0.3, 0.5)
+                baby_energy = energy_max[sid] * random.uniform(0.3, 0.5)
                 baby = CreatureInstance(
-                    f"{creature.spec_id}_{uuid.uuid4().hex[:6]}",
-                    creature.spec_id,
+                    make_creature_uid(sid),
+                    sid,
                     baby_energy,
                     0
                 )
                 newborns.append(baby)
-                messages.append(f"{spec['name']} تكاثر وأنتج نسلاً جديداً")
+                if verbose:
+                    messages.append(f"{CREATURES[sid]['name']} تكاثر وأنتج نسلاً جديداً")
         
         # إضافة المواليد الجدد
         world.creatures.extend(newborns)
         return messages
 
-    def develop_settlements(self, world: World) -> List[str]:
+    def develop_settlements(self, world: World, verbose: bool = True,
+                            now: Optional[float] = None) -> List[str]:
         """تطور المستوطنات في العالم"""
-        messages = []
-        
+        messages = [] if verbose else _NO_MSGS
+        if now is None:
+            now = time.time()
+
         for settlement in world.settlements:
-            settlement.update_settlement(time.time())
-            
-            # بناء عشوائي
-            if random.random() < 0.2:
-                available_buildings = [b for b in BUILDINGS.keys() if settlement.resources.get("wood", 0) >= 10]
-                if available_buildings:
-                    building_to_build = random.choice(available_buildings)
-                    building_cost = BUILDINGS[building_to_build].get("cost", {})
-                    if all(settlement.resources.get(res, 0) >= amount for res, amount in building_cost.items()):
-                        for res, amount in building_cost.items():
-                            settlement.resources[res] -= amount
-                        settlement.buildings[building_to_build] = settlement.buildings.get(building_to_build, 0) + 1
+            settlement.update_settlement(now)
+            
+            # بناء عشوائي: شرط الخشب لا يعتمد على المبنى، فيفحص مرة واحدة
+            # ويختار من قائمة المعرفات الثابتة بدل بناء قائمة كل دورة
+            if _BUILDING_IDS and random.random() < 0.2 and settlement.resources.get("wood", 0) >= 10:
+                building_to_build = random.choice(_BUILDING_IDS)
+                resources = settlement.resources
+                building_cost = _BUILDING_COSTS[building_to_build]
+                if all(resources.get(res, 0) >= amount for res, amount in building_cost):
+                    for res, amount in building_cost:
+                        resources[res] -= amount
+                    settlement.buildings[building_to_build] = settlement.buildings.get(building_to_build, 0) + 1
+                    if verbose:
                         messages.append(f"مستوطنة {settlement.name} بنت {building_to_build}")
         
         return messages
 
-    def simulate_settlement_tick(self, settlement: HumanSettlement, world: World = None) -> List[str]:
+    def simulate_settlement_tick(self, settlement: HumanSettlement, world: World = None,
+                                 verbose: bool = True, now: Optional[float] = None) -> List[str]:
         """محاكاة تطور المستوطنة"""
-        messages = []
-        
+        messages = [] if verbose else _NO_MSGS
+
         # تحديث المستوطنة
-        settlement.update_settlement(time.time())
+        settlement.update_settlement(now if now is not None else time.time())
         
         # أحداث عشوائية في المستوطنة
         if random.random() < 0.1:
             event_type = random.choice(["discovery", "problem", "celebration"])
             if event_type == "discovery":
-                resource = random.choice(list(BLOCKS.keys()))
+                resource = random.choice(_BLOCK_KEYS)
                 amount = random.randint(1, 5)
                 settlement.resources[resource] = settlement.resources.get(resource, 0) + amount
-                resource_name = BLOCKS.get(resource, {}).get('name', resource)
-                messages.append(f"📜 مستوطنة {settlement.name} اكتشفت {amount} من {resource_name}")
+                if verbose:
+                    resource_name = block_name(resource)
+                    messages.append(f"📜 مستوطنة {settlement.name} اكتشفت {amount} من {resource_name}")
             
             elif event_type == "problem":
                 problem = random.choice(["sickness", "attack", "shortage"])
                 if problem == "sickness":
                     settlement.population = max(1, settlement.population - 1)
-                    messages.append(f"🤒 مرض في مستوطنة {settlement.name}. فقدان سكاني")
+                    if verbose:
+                        messages.append(f"🤒 مرض في مستوطنة {settlement.name}. فقدان سكاني")
                 elif problem == "attack" and world:
                     # هجوم مخلوقات على المستوطنة
                     if world.creatures and settlement.defense < 20:
                         damage = random.randint(1, 3)
                         settlement.resources["food"] = max(0, settlement.resources.get("food", 0) - damage)
-                        messages.append(f"⚔️ هجوم على مستوطنة {settlement.name}. فقدان {damage} غذاء")
+                        if verbose:
+                            messages.append(f"⚔️ هجوم على مستوطنة {settlement.name}. فقدان {damage} غذاء")
             
             elif event_type == "celebration":
                 settlement.happiness = min(100, settlement.happiness + 10)
-                messages.append(f"🎉 احتفال في مستوطنة {settlement.name}. زيادة السعادة")
+                if verbose:
+                    messages.append(f"🎉 احتفال في مستوطنة {settlement.name}. زيادة السعادة")
         
         return messages
 
-    def _base_simulation_tick(self, context: Any, params: Dict, ticks: int) -> List[str]:
+    def _base_simulation_tick(self, context: Any, params: Dict, ticks: int, verbose: bool = True) -> List[str]:
+        # verbose=False للدورات الخلفية: تخطي تنسيق f-strings بالكامل حيث
+        # تُرمى الرسائل لاحقًا دون عرض، فلا داعي لضغط المخصص بها
         messages: List[str] = []
-        rnd = random.Random(getattr(context, 'seed', int(time.time())) + int(time.time()))
-        
+        rnd = self._sim_rnd
+        # الفروع الثابتة عبر الدورات تحسم مرة واحدة خارج حلقة التكرار
+        is_world = isinstance(context, World)
+        is_inner = params.get("is_inner_world", False)
+        regen_scalar = params["regen_scalar"]
+        size_factor = params["size_base"] / 1000.0
+        biome_effects = BIOMES.get(context.biome, {}).get("effects") if is_world else None
+        biome_name = BIOMES.get(context.biome, {}).get("name", "") if is_world else ""
+
         for tick in range(ticks):
-            # نمو العناصر
-            for bid, spec in BLOCKS.items():
-                if "grow_rate" not in spec:
-                    continue
-                    
-                rate = spec.get("grow_rate", 0.0) * params["regen_scalar"]
+            # عينة زمنية واحدة لكل دورة تمرر للأنظمة الفرعية بدل استدعاء
+            # time.time() داخل كل حلقة
+            now = time.time()
+            # نمو العناصر: الكتل القابلة للنمو محصورة مسبقًا
+            for bid, grow_rate, bname in _GROWABLE_BLOCKS:
+                rate = grow_rate * regen_scalar
                 if rate > 0:
-                    growth_expect = max(0, (params["size_base"] / 1000.0) * rate * rnd.uniform(0.5, 1.8) * 10)
-                    if growth_expect > 0 and random.random() < 0.9:
+                    growth_expect = max(0, size_factor * rate * rnd.uniform(0.5, 1.8) * 10)
+                    if growth_expect > 0 and rnd.random() < 0.9:
                         add = max(1, int(growth_expect * rnd.uniform(0.3, 0.9)))
-                        context.elements[bid] = context.elements.get(bid, 0) + add
-                        if params.get("is_inner_world", False):
-                            messages.append(f"في {context.name} نمت {add}× {spec['name']}.")
-            
+                        context.elements[bid] += add
+                        if verbose and is_inner:
+                            messages.append(f"في {context.name} نمت {add}× {bname}.")
+
             # تأثيرات البيئة
-            if isinstance(context, World) and "effects" in (biome_data := BIOMES.get(context.biome, {})):
-                if rnd.random() < biome_data["effects"].get("tick_damage_prob", 0.0):
-                    dmg = biome_data["effects"]["tick_damage_amount"]
+            if biome_effects:
+                if rnd.random() < biome_effects.get("tick_damage_prob", 0.0):
+                    dmg = biome_effects["tick_damage_amount"]
                     for c in context.creatures:
                         c.energy -= dmg
-                    messages.append(f"هالة {biome_data['name']} ألحقت {dmg:.1f} ضرر بكل المخلوقات.")
+                    if verbose:
+                        messages.append(f"هالة {biome_name} ألحقت {dmg:.1f} ضرر بكل المخلوقات.")
 
             # تطبيق العلاقات بين العناصر
-            if isinstance(context, World):
-                relation_msgs = self.apply_element_relationships(context)
+            if is_world:
+                relation_msgs = self.apply_element_relationships(context, verbose)
                 messages.extend(relation_msgs)
-                
+
                 # الافتراس والموارد
-                predation_msgs = self.handle_predation_and_resources(context)
+                predation_msgs = self.handle_predation_and_resources(context, verbose)
                 messages.extend(predation_msgs)
-                
+
                 # التحلل
-                decomposition_msgs = self.decomposition_system(context)
+                decomposition_msgs = self.decomposition_system(context, verbose)
                 messages.extend(decomposition_msgs)
-                
+
                 # التكاثر المحسن
-                reproduction_msgs = self.enhanced_reproduction(context)
+                reproduction_msgs = self.enhanced_reproduction(context, verbose, now)
                 messages.extend(reproduction_msgs)
-                
+
                 # تطور المستوطنات
-                settlement_msgs = self.develop_settlements(context)
+                settlement_msgs = self.develop_settlements(context, verbose, now)
                 messages.extend(settlement_msgs)
 
-            # محاكاة المخلوقات الأساسية
-            newborns: List[CreatureInstance] = []
-            creatures_to_remove = []
-            
+            # محاكاة المخلوقات الأساسية: مسار واحد يبني قائمة الناجين مباشرة
+            # بدل جمع الموتى ثم ترشيح القائمة في مسار ثانٍ
+            survivors: List[CreatureInstance] = []
+            dead_count = 0
+            energy_decay = params["energy_decay"]
+            # ثوابت الحلقة تقرأ مرة واحدة: السمات والقواميس العامة تصبح أسماء محلية
+            elements = context.elements
+            player = self.player
+            qi_enabled = params.get("qi_production_enabled", False)
+            has_qi_rate = hasattr(context, 'qi_generation_rate')
+            qi_mult = 1 + player.level * 0.01
+            energy_max = _SPEC_ENERGY_MAX
+            lifespan = _SPEC_LIFESPAN
+            qi_prod = _SPEC_QI_PROD
+            diet_pool = _SPEC_DIET_POOL
+
             for cre in context.creatures:
-                spec = CREATURES.get(cre.spec_id)
-                if not spec: 
+                sid = cre.spec_id
+                # الجداول المسطحة تغطي كل الأنواع المعروفة؛ ما خرج عنها مجهول
+                if sid not in energy_max:
+                    survivors.append(cre)
                     continue
 
                 # التغذية
-                fed = False
-                diet = spec["diet"]
-                resource_pool = DIET_TO_RESOURCES.get(diet, [])
-                found_food = next((pid for pid in resource_pool if context.elements.get(pid, 0) > 0), None)
+                found_food = next((pid for pid in diet_pool[sid]
+                                   if elements.get(pid, 0) > 0), None)
                 if found_food:
-                    context.elements[found_food] -= 1
-                    if context.elements[found_food] <= 0: 
-                        del context.elements[found_food]
-                    cre.energy = min(spec["energy_max"], cre.energy + BLOCKS.get(found_food, {}).get("energy", 0) * 0.9)
-                    fed = True
-                
+                    elements[found_food] -= 1
+                    if elements[found_food] <= 0:
+                        del elements[found_food]
+                    cre.energy = min(energy_max[sid],
+                                     cre.energy + _BLOCK_FOOD_ENERGY.get(found_food, 0.0))
+
                 # استهلاك الطاقة والشيخوخة
-                cre.energy -= params["energy_decay"]
+                cre.energy -= energy_decay
                 cre.age += 1
 
                 # إنتاج Qi في العالم الداخلي
-                if params.get("qi_production_enabled", False) and "qi_production" in spec:
-                    if cre.energy > spec["energy_max"] * 0.2:
-                        produced_qi = spec["qi_production"] * (1 + self.player.level * 0.01)
-                        self.player.qi = min(5000.0, self.player.qi + produced_qi)
-                        if hasattr(context, 'qi_generation_rate'):
+                if qi_enabled:
+                    produced_qi = qi_prod[sid]
+                    if produced_qi and cre.energy > energy_max[sid] * 0.2:
+                        produced_qi *= qi_mult
+                        q = player.qi + produced_qi
+                        player.qi = q if q < QI_MAX else QI_MAX
+                        if has_qi_rate:
                             context.qi_generation_rate += produced_qi
 
                 # الموت بسبب الطاقة المنخفضة أو العمر
-                if cre.energy <= 0 or cre.age > spec.get("lifespan", 1000):
-                    creatures_to_remove.append(cre)
-                    context.elements["mystic_moss"] = context.elements.get("mystic_moss", 0) + 1
-            
-            # إزالة المخلوقات الميتة
-            for cre in creatures_to_remove:
-                if cre in context.creatures:
-                    context.creatures.remove(cre)
-            
-            # إضافة المواليد الجدد
-            context.creatures.extend(newborns)
+                if cre.energy <= 0 or cre.age > lifespan[sid]:
+                    dead_count += 1
+                else:
+                    survivors.append(cre)
+
+            if dead_count:
+                # الطحلب الناتج عن الموتى يضاف دفعة واحدة، والقائمة تستبدل
+                # فقط عند حدوث وفيات حفاظًا على فهرس المعرفات الكسول
+                context.elements["mystic_moss"] += dead_count
+                context.creatures = survivors
+                context._creatures_version += 1
             
             # تتبع الاستقرار البيئي في العالم الداخلي
             if hasattr(context, 'stable_ecosystem_ticks') and len(context.creatures) >= 5:
@@ -2679,12 +3226,12 @@ class Engine:
                         messages.append("🎉 تحقيق إنجاز: توازن بيئي!")
             else:
                 context.stable_ecosystem_ticks = 0
-                
-            context.last_tick = time.time()
+
+            context.last_tick = now
         
         return messages
 
-    def simulate_world_tick(self, w: World, ticks: int = 1) -> List[str]:
+    def simulate_world_tick(self, w: World, ticks: int = 1, verbose: bool = True) -> List[str]:
         params = {
             "regen_scalar": w.regen_rate_scalar,
             "size_base": w.size_cubes,
@@ -2694,17 +3241,18 @@ class Engine:
             "qi_production_enabled": False,
             "tick_interval": CONFIG.get("TICK_INTERVAL_SEC", 6)
         }
-        msgs = self._base_simulation_tick(w, params, ticks)
-        
+        msgs = self._base_simulation_tick(w, params, ticks, verbose)
+
         # محاكاة المستوطنات في العالم
+        now = time.time()
         for settlement in w.settlements:
-            settlement_msgs = self.simulate_settlement_tick(settlement, w)
+            settlement_msgs = self.simulate_settlement_tick(settlement, w, verbose, now)
             msgs.extend(settlement_msgs)
         
-        self.storage.save_world(w)
+        self._mark_world_dirty(w)
         return msgs
 
-    def simulate_inner_tick(self, inner: InnerWorld, ticks: int = 1) -> List[str]:
+    def simulate_inner_tick(self, inner: InnerWorld, ticks: int = 1, verbose: bool = True) -> List[str]:
         cultivation_bonus = 1 + (0.1 * (self.player.skills.get("cultivation", 1) - 1))
         params = {
             "regen_scalar": cultivation_bonus,
@@ -2719,7 +3267,7 @@ class Engine:
         # Reset Qi generation rate for this tick
         inner.qi_generation_rate = 0.0
         
-        msgs = self._base_simulation_tick(inner, params, ticks)
+        msgs = self._base_simulation_tick(inner, params, ticks, verbose)
         
         # تطبيق تأثيرات المباني
         building_effects = inner.buildings.get_building_effects()
@@ -2727,15 +3275,16 @@ class Engine:
             inner.effect_system.apply_effect(effect, 3600, value, "buildings")
         
         # تطور المستوطنات الداخلية
+        now = time.time()
         for settlement in inner.settlements:
-            settlement_msgs = self.simulate_settlement_tick(settlement)
+            settlement_msgs = self.simulate_settlement_tick(settlement, verbose=verbose, now=now)
             msgs.extend(settlement_msgs)
             
             # إنتاج الموارد من المهن
             production = settlement.get_production()
             for resource, amount in production.items():
                 # إضافة الإنتاج إلى مخزون اللاعب
-                self.player.inventory[resource] = self.player.inventory.get(resource, 0) + amount
+                self.player.inventory[resource] += amount
             
             # منح خبرة المهارات بناء على الإنتاج
             for profession, count in settlement.professions.items():
@@ -2758,24 +3307,26 @@ class Engine:
         if auto_use_msg:
             msgs.append(auto_use_msg)
             
-        self.storage.save_player(self.player.to_dict())
+        self._player_dirty = True
         return msgs
 
     def tick(self, key: str, ticks: int = 1) -> str:
-        if normalize_ar_text(key) in ("داخلي","داخل","inner"):
-            msgs = self.simulate_inner_tick(self.player.inner, ticks)
-            return "\n".join(msgs) if msgs else f"انتهت محاكاة {ticks} ticks للعالم الداخلي."
-        w = self.resolve_world(key)
-        if not w: return "العالم غير موجود."
-        msgs = self.simulate_world_tick(w, min(ticks, CONFIG.get("MAX_WORLD_TICKS_PER_RUN",3)))
-        return "\n".join(msgs) if msgs else f"انتهت محاكاة {ticks} ticks على {w.name}."
+        # الدورة اليدوية تعدل نفس النسخ المكاشة التي يدورها الخيط الخلفي
+        with self.lock:
+            if normalize_ar_text(key) in ("داخلي","داخل","inner"):
+                msgs = self.simulate_inner_tick(self.player.inner, ticks)
+                return "\n".join(msgs) if msgs else f"انتهت محاكاة {ticks} ticks للعالم الداخلي."
+            w = self.resolve_world(key)
+            if not w: return _ERR_NO_WORLD
+            msgs = self.simulate_world_tick(w, min(ticks, CONFIG.get("MAX_WORLD_TICKS_PER_RUN",3)))
+            return "\n".join(msgs) if msgs else f"انتهت محاكاة {ticks} ticks على {w.name}."
 
     def show_inventory(self) -> str:
         if not self.player.inventory:
             return "المخزن فارغ."
         output = ["📦 مخزنك:"]
         for item_id, quantity in self.player.inventory.items():
-            item_name = BLOCKS.get(item_id, {}).get('name', item_id)
+            item_name = block_name(item_id)
             output.append(f"  {item_name}: {quantity}")
         return "\n".join(output)
 
@@ -2803,55 +3354,65 @@ class Engine:
         return "\n".join(output)
 
     def show_recipes(self) -> str:
-        output = ["📜 وصفات الصناعة:"]
-        for recipe_id, recipe_data in RECIPES.items():
-            ingredients = []
-            for item, amount in recipe_data.get("ingredients", {}).items():
-                item_name = BLOCKS.get(item, {}).get('name', item)
-                ingredients.append(f"{amount}× {item_name}")
-        
-            outputs = []
-            for item, amount in recipe_data.get("output", {}).items():
-                item_name = BLOCKS.get(item, {}).get('name', item)
-                outputs.append(f"{amount}× {item_name}")
-        
-            output.append(f"\n{recipe_data.get('name', recipe_id)}:")
-            output.append(f"  المكونات: {', '.join(ingredients)}")
-            output.append(f"  الناتج: {', '.join(outputs)}")
-    
-        return "\n".join(output)
+        # بناء النص كتعبير واحد يغذي join بدل قوائم append المتداخلة
+        return "📜 وصفات الصناعة:" + "".join(
+            f"\n\n{recipe_data.get('name', recipe_id)}:\n"
+            f"  المكونات: {', '.join(f'{amount}× {block_name(item)}' for item, amount in recipe_data.get('ingredients', {}).items())}\n"
+            f"  الناتج: {', '.join(f'{amount}× {block_name(item)}' for item, amount in recipe_data.get('output', {}).items())}"
+            for recipe_id, recipe_data in RECIPES.items()
+        )
 
     def meditate(self, hours: int) -> str:
         if hours <= 0:
             return "عدد الساعات يجب أن يكون موجباً."
-        qi_gain = hours * 10 * (1 + 0.1 * (self.player.skills.get("qi_mastery", 1) - 1))
-        self.player.qi = min(5000.0, self.player.qi + qi_gain)
+        with self.lock:
+            qi_gain = hours * 10 * (1 + 0.1 * (self.player.skills.get("qi_mastery", 1) - 1))
+            q = self.player.qi + qi_gain
+            self.player.qi = q if q < QI_MAX else QI_MAX
 
-        self.storage.save_player(self.player.to_dict())
-        return f"تأملت لمدة {hours} ساعات واستعدت {qi_gain:.1f} Qi."
+            self._player_dirty = True
+            return f"تأملت لمدة {hours} ساعات واستعدت {qi_gain:.1f} Qi."
 
     def simulate_all_once(self, ticks_per_world: int = 1) -> List[str]:
-        msgs = []
-        for wid in self.storage.list_worlds():
-            w = self.storage.load_world(wid)
-            if not w: continue
+        # القفل إلزامي: الدورة الخلفية تعدل نفس النسخ المكاشة التي تقرأها
+        # أوامر الـ REPL (وكلها تمسك القفل)، وبدونه تتغير القواميس أثناء
+        # مرور الخيط الآخر عليها؛ القفل RLock والدورات رخيصة
+        with self.lock:
+            msgs = self._msg_scratch
+            msgs.clear()
+            # الدورة الخلفية لا تعرض رسائلها إلا في سجل DEBUG، فلا ننسقها أصلاً
+            # ما لم يكن هذا المستوى مفعلاً
+            verbose = _LOG.isEnabledFor(logging.DEBUG)
+            # المرور عبر كاش المحرك: بلا إعادة تفكيك من القاعدة كل دورة، والدورة
+            # تعدل النسخة المكاشة نفسها التي يكتبها التفريغ المؤجل لاحقًا
+            for wid in list(self._all_world_ids):
+                w = self.resolve_world(wid)
+                if not w: continue
+                try:
+                    res = self.simulate_world_tick(w, ticks_per_world, verbose)
+                    msgs.extend(res)
+                except Exception:
+                    _LOG.exception("World tick error for %s", wid)
             try:
-                res = self.simulate_world_tick(w, ticks_per_world)
-                msgs.extend(res)
+                res_in = self.simulate_inner_tick(self.player.inner, ticks_per_world, verbose)
+                msgs.extend(res_in)
             except Exception:
-                logging.exception(f"World tick error for {wid}")
-        try:
-            res_in = self.simulate_inner_tick(self.player.inner, ticks_per_world)
-            msgs.extend(res_in)
-        except Exception:
-            logging.exception("Inner world tick error")
-        self._ensure_world_pool()
-        if CONFIG.get("SAVE_EVERY_RUN", True):
-            self.storage.save_player(self.player.to_dict())
-        return msgs
+                _LOG.exception("Inner world tick error")
+            self._ensure_world_pool()
+            self._player_dirty = True
+            # تجميع الكتابة: دفعة واحدة كل فترة بدل fsync مع كل دورة خلفية
+            now_m = time.monotonic()
+            if now_m - self._last_flush >= CONFIG.get("SAVE_BATCH_INTERVAL_SEC", 30):
+                self._flush_dirty()
+                self._last_flush = now_m
+            # لقطة للمستدعي؛ القائمة الأصلية تعاد تهيئتها في الدورة التالية
+            return list(msgs)
 
     def close(self):
-        self.storage.close()
+        # نفس القفل: خيط المحاكاة قد يكون في منتصف دورة عند الخروج
+        with self.lock:
+            self._flush_dirty()
+            self.storage.close()
 
 class SimulationManager(threading.Thread):
     def __init__(self, engine: Engine, interval_sec: int = 6, ticks_each: int = 1):
@@ -2862,70 +3423,23 @@ class SimulationManager(threading.Thread):
         self._stop_event = threading.Event()
 
     def run(self):
-        logging.info("SimulationManager started.")
-        last = time.time()
-        while not self._stop_event.is_set():
-            now = time.time()
-            if now - last >= self.interval:
-                try:
-                    msgs = self.engine.simulate_all_once(self.ticks_each)
-                    if msgs:
-                        for m in msgs[:12]:
-                            logging.debug("Sim: %s", m)
-                except Exception:
-                    logging.exception("Simulation run failed")
-                last = now
-            self._stop_event.wait(0.5)
+        _LOG.info("SimulationManager started.")
+        # انتظار واحد بطول الفترة: stop() يوقظه فورًا عبر الحدث،
+        # فلا حاجة للاستيقاظ كل نصف ثانية لفحص الساعة
+        while not self._stop_event.wait(self.interval):
+            try:
+                msgs = self.engine.simulate_all_once(self.ticks_each)
+                # سجل واحد مجمّع بدل استدعاء debug لكل رسالة؛ القائمة أصلاً
+                # لا تبنى إلا عندما يكون مستوى DEBUG مفعلاً
+                if msgs and _LOG.isEnabledFor(logging.DEBUG):
+                    _LOG.debug("Sim: %s", " | ".join(msgs[:12]))
+            except Exception:
+                _LOG.exception("Simulation run failed")
 
     def stop(self):
         self._stop_event.set()
 
 
-COMMANDS = {
-    "قائمة":"list",
-    "عرض":"travel",
-    "جمع":"gather","اجمع":"gather",
-    "ابتلع":"ingest","ابتلاع":"ingest",
-    "ابتلع_مخلوق":"ingest_creature",
-    "ابتلع_من_مستوطنة":"ingest_settlement_creatures",
-    "مخلوقات":"creatures",
-    "زرع":"plant","حصاد":"harvest",
-    "هاجم":"attack","هجوم":"attack",
-    "تركيب":"mount","فك":"unmount",
-    "tick":"tick",
-    "داخلي":"inner",
-    "مخزن":"inv",
-    "احصائيات":"stats",
-    "مهارات": "skills",
-    "طور": "develop",
-    "وصفات": "recipes",
-    "اصنع": "craft",
-    "بناء": "build_structure",
-    "مستوطنة": "create_settlement",
-    "مستوطنات": "list_settlements",
-    "جمع_موارد": "collect_settlement",
-    "بناء_مستوطنة": "build_in_settlement",
-    "تعيين_مهنة": "assign_profession",
-    "تأمل":"meditate",
-    "لقطات":"snapshots",
-    "عرض_لقطة":"snapshot","حذف_لقطة":"delete_snapshot",
-    "تنظيف_اللقطات":"cleanup_snapshots",
-    "تصدير":"export",
-    "حفظ":"save","خروج":"exit","مساعدة":"help",
-    "إنجازات":"achievements",
-    "مهاراتي": "show_skills",
-    "تدريب": "train_skill",
-    "مهن": "show_professions",
-    "تجارة": "trade_item",
-    "عملات": "check_currency",
-    "إنتاج": "check_production",
-    "سمعة": "reputation_info",
-    "معلومات_مبنى": "building_info",
-    "معلومات_مهنة": "profession_info",
-    "السوق": "market_info",
-    "تأثيرات": "active_effects"
-}
-
 def print_banner():
     print("="*96)
     print(colored_text("Nested Worlds: Reborn", Colors.BOLD + Colors.CYAN))
@@ -2933,62 +3447,354 @@ def print_banner():
     print("="*96)
 
 def print_help():
-    print("-"*96)
-    print(colored_text("الأوامر الأساسية:", Colors.BOLD))
-    print("قائمة                                - عرض العوالم المتاحة")
-    print("عرض <id|الاسم>                      - وصف عالم")
-    print("مخلوقات <id|الاسم>                   - عرض مخلوقات عالم")
-    print("جمع <id|الاسم> [عدد]                - جمع موارد (تضاف للمخزن)")
-    print("ابتلع <id|الاسم> [عدد]               - ابتلاع مكعبات (يضاف إلى الداخل)")
-    print("ابتلع_مخلوق <id|الاسم> <UID>         - ابتلاع مخلوق إلى الداخل")
-    print("هاجم <id|الاسم> <UID> [qi_cost]      - هجوم طاقي على مخلوق")
-    print("\n" + colored_text("الأوامر الداخلية والزراعة:", Colors.BOLD))
-    print("داخلي                                - عرض حالة العالم الداخلي")
-    print("زرع <مورد_id> [عدد]                 - زرع موارد من المخزن داخل عالمك")
-    print("حصاد <مورد_id> [عدد]                - حصاد موارد من عالمك إلى المخزن")
-    print("تركيب <id|الاسم> <نقطة>             - تركيب عالم")
-    print("فك <نقطة>                            - إزالة تركيب")
-    print("بناء <هيكل_id>                      - بناء هيكل في العالم الداخلي")
-    print("مستوطنة <اسم>                        - إنشاء مستوطنة جديدة")
-    print("\n" + colored_text("نظام المستوطنات المتكامل:", Colors.BOLD))
-    print("مستوطنات                             - عرض جميع المستوطنات")
-    print("مستوطنة <اسم>                        - عرض معلومات مستوطنة")
-    print("جمع_موارد <مستوطنة> [مورد] [عدد]    - جمع موارد من مستوطنة")
-    print("بناء_مستوطنة <مستوطنة> <مبنى>       - بناء مبنى في مستوطنة")
-    print("تعيين_مهنة <مستوطنة> <مهنة> <عدد>   - تعيين سكان في مهن")
-    print("ابتلع_من_مستوطنة <مستوطنة> [عدد]    - ابتلاع مخلوقات من حول مستوطنة")
-    print("إنتاج <مستوطنة>                      - عرض إنتاج المستوطنة")
-    print("\n" + colored_text("نظام المهارات والمهن الجديد:", Colors.BOLD))
-    print("مهاراتي                              - عرض مهاراتك وتأثيراتها")
-    print("تدريب <مهارة> <ساعات>               - تدريب مهارة معينة")
-    print("مهن                                  - عرض المهن المتاحة")
-    print("معلومات_مهنة <مهنة>                  - عرض متطلبات مهنة")
-    print("\n" + colored_text("نظام الاقتصاد والتجارة:", Colors.BOLD))
-    print("تجارة <شراء|بيع> <عنصر> [عدد]       - شراء أو بيع عنصر")
-    print("عملات                                - عرض عملاتك")
-    print("السوق                                - عرض حالة السوق")
-    print("\n" + colored_text("نظام التأثيرات والسمعة:", Colors.BOLD))
-    print("تأثيرات                              - عرض التأثيرات النشطة")
-    print("سمعة                                 - عرض سمعتك مع الفصائل")
-    print("معلومات_مبنى <مبنى>                  - عرض معلومات عن مبنى")
-    print("\n" + colored_text("التطوير والصناعة:", Colors.BOLD))
-    print("احصائيات                             - إحصاءات اللاعب")
-    print("مهارات                               - عرض مهاراتك ومستوياتها")
-    print("طور <ابتلاع|طاقة|زراعة|قتال|بناء|تجارة> - تطوير مهارة")
-    print("وصفات                                - عرض وصفات الصناعة المتاحة")
-    print("اصنع <وصفة_id>                      - صناعة عنصر من المكونات")
-    print("إنجازات                              - عرض الإنجازات المحققة")
-    print("\n" + colored_text("أوامر النظام والمحاكاة:", Colors.BOLD))
-    print("مخزن                                 - عرض المستودع")
-    print("tick <id|الاسم|داخلي> [n]            - محاكاة يدوية للعالم أو الداخل")
-    print("لقطات                                - عرض لقطات محفوظة")
-    print("عرض_لقطة <key>                       - عرض محتوى لقطة")
-    print("حذف_لقطة <key>                       - حذف لقطة")
-    print("تنظيف_اللقطات [N]                   - احتفظ بآخر N لقطة لكل عالم")
-    print("تصدير <file.json>                    - تصدير الحالة إلى JSON")
-    print("حفظ                                  - حفظ يدوي")
-    print("خروج                                 - حفظ وإغلاق")
-    print("-"*96)
+    # بناء نص المساعدة كاملًا وإخراجه بكتابة واحدة بدل ~50 استدعاء print
+    lines = [
+        "-"*96,
+        colored_text("الأوامر الأساسية:", Colors.BOLD),
+        "قائمة                                - عرض العوالم المتاحة",
+        "عرض <id|الاسم>                      - وصف عالم",
+        "مخلوقات <id|الاسم>                   - عرض مخلوقات عالم",
+        "جمع <id|الاسم> [عدد]                - جمع موارد (تضاف للمخزن)",
+        "ابتلع <id|الاسم> [عدد]               - ابتلاع مكعبات (يضاف إلى الداخل)",
+        "ابتلع_مخلوق <id|الاسم> <UID>         - ابتلاع مخلوق إلى الداخل",
+        "هاجم <id|الاسم> <UID> [qi_cost]      - هجوم طاقي على مخلوق",
+        "\n" + colored_text("الأوامر الداخلية والزراعة:", Colors.BOLD),
+        "داخلي                                - عرض حالة العالم الداخلي",
+        "زرع <مورد_id> [عدد]                 - زرع موارد من المخزن داخل عالمك",
+        "حصاد <مورد_id> [عدد]                - حصاد موارد من عالمك إلى المخزن",
+        "تركيب <id|الاسم> <نقطة>             - تركيب عالم",
+        "فك <نقطة>                            - إزالة تركيب",
+        "بناء <هيكل_id>                      - بناء هيكل في العالم الداخلي",
+        "مستوطنة <اسم>                        - إنشاء مستوطنة جديدة",
+        "\n" + colored_text("نظام المستوطنات المتكامل:", Colors.BOLD),
+        "مستوطنات                             - عرض جميع المستوطنات",
+        "مستوطنة <اسم>                        - عرض معلومات مستوطنة",
+        "جمع_موارد <مستوطنة> [مورد] [عدد]    - جمع موارد من مستوطنة",
+        "بناء_مستوطنة <مستوطنة> <مبنى>       - بناء مبنى في مستوطنة",
+        "تعيين_مهنة <مستوطنة> <مهنة> <عدد>   - تعيين سكان في مهن",
+        "ابتلع_من_مستوطنة <مستوطنة> [عدد]    - ابتلاع مخلوقات من حول مستوطنة",
+        "إنتاج <مستوطنة>                      - عرض إنتاج المستوطنة",
+        "\n" + colored_text("نظام المهارات والمهن الجديد:", Colors.BOLD),
+        "مهاراتي                              - عرض مهاراتك وتأثيراتها",
+        "تدريب <مهارة> <ساعات>               - تدريب مهارة معينة",
+        "مهن                                  - عرض المهن المتاحة",
+        "معلومات_مهنة <مهنة>                  - عرض متطلبات مهنة",
+        "\n" + colored_text("نظام الاقتصاد والتجارة:", Colors.BOLD),
+        "تجارة <شراء|بيع> <عنصر> [عدد]       - شراء أو بيع عنصر",
+        "عملات                                - عرض عملاتك",
+        "السوق                                - عرض حالة السوق",
+        "\n" + colored_text("نظام التأثيرات والسمعة:", Colors.BOLD),
+        "تأثيرات                              - عرض التأثيرات النشطة",
+        "سمعة                                 - عرض سمعتك مع الفصائل",
+        "معلومات_مبنى <مبنى>                  - عرض معلومات عن مبنى",
+        "\n" + colored_text("التطوير والصناعة:", Colors.BOLD),
+        "احصائيات                             - إحصاءات اللاعب",
+        "مهارات                               - عرض مهاراتك ومستوياتها",
+        "طور <ابتلاع|طاقة|زراعة|قتال|بناء|تجارة> - تطوير مهارة",
+        "وصفات                                - عرض وصفات الصناعة المتاحة",
+        "اصنع <وصفة_id>                      - صناعة عنصر من المكونات",
+        "إنجازات                              - عرض الإنجازات المحققة",
+        "\n" + colored_text("أوامر النظام والمحاكاة:", Colors.BOLD),
+        "مخزن                                 - عرض المستودع",
+        "tick <id|الاسم|داخلي> [n]            - محاكاة يدوية للعالم أو الداخل",
+        "لقطات                                - عرض لقطات محفوظة",
+        "عرض_لقطة <key>                       - عرض محتوى لقطة",
+        "حذف_لقطة <key>                       - حذف لقطة",
+        "تنظيف_اللقطات [N]                   - احتفظ بآخر N لقطة لكل عالم",
+        "تصدير <file.json>                    - تصدير الحالة إلى JSON",
+        "حفظ                                  - حفظ يدوي",
+        "خروج                                 - حفظ وإغلاق",
+        "-"*96,
+    ]
+    print("\n".join(lines))
+
+# ---------------------------
+# معالجات الأوامر: دالة لكل أمر وجدول إرسال واحد بدل سلسلة if/elif طويلة
+# ---------------------------
+def _joinargs(args: List[str]) -> str:
+    # الحالة الشائعة وسيط واحد: أعد السلسلة نفسها بلا join ولا نسخة جديدة
+    return args[0] if len(args) == 1 else " ".join(args)
+
+def _parse_int(s: str, what: str) -> Optional[int]:
+    # تحقق رخيص بدل رمي ValueError والتقاطه في الغلاف العام
+    try:
+        return int(s)
+    except ValueError:
+        print(f"{what} يجب أن يكون رقماً")
+        return None
+
+def _cmd_list_settlements(eng: Engine, args: List[str]):
+    print(eng.list_settlements())
+
+def _cmd_show_settlement(eng: Engine, args: List[str]):
+    print(eng.show_settlement(_joinargs(args)))
+
+def _cmd_collect_settlement(eng: Engine, args: List[str]):
+    settlement_name = args[0]
+    resource = args[1] if len(args) > 1 else None
+    amount = int(args[2]) if len(args) > 2 else None
+    print(eng.collect_settlement_resources(settlement_name, resource, amount))
+
+def _cmd_build_in_settlement(eng: Engine, args: List[str]):
+    print(eng.build_in_settlement(args[0], args[1]))
+
+def _cmd_ingest_settlement_creatures(eng: Engine, args: List[str]):
+    settlement_name = args[0]
+    max_creatures = int(args[1]) if len(args) > 1 else None
+    print(eng.ingest_settlement_creatures(settlement_name, max_creatures))
+
+def _cmd_show_skills(eng: Engine, args: List[str]):
+    print(eng.show_skills())
+
+def _cmd_train_skill(eng: Engine, args: List[str]):
+    hours = _parse_int(args[1], "عدد الساعات")
+    if hours is not None:
+        print(eng.train_skill(args[0], hours))
+
+def _cmd_show_professions(eng: Engine, args: List[str]):
+    print(eng.show_professions())
+
+def _cmd_profession_info(eng: Engine, args: List[str]):
+    requirements = eng.profession_system.get_profession_requirements(args[0])
+    if requirements:
+        print(f"متطلبات مهنة {args[0]}:")
+        for skill, level in requirements.items():
+            skill_name = eng.player.get_skill_name(skill)
+            print(f"- {skill_name}: المستوى {level}")
+    else:
+        print("المهنة غير موجودة")
+
+def _cmd_assign_profession(eng: Engine, args: List[str]):
+    count = _parse_int(args[2], "العدد")
+    if count is not None:
+        print(eng.assign_profession(args[0], args[1], count))
+
+def _cmd_trade_item(eng: Engine, args: List[str]):
+    quantity = int(args[2]) if len(args) > 2 else 1
+    print(eng.trade_item(args[0], args[1], quantity))
+
+def _cmd_check_currency(eng: Engine, args: List[str]):
+    print(eng.check_currency())
+
+def _cmd_check_production(eng: Engine, args: List[str]):
+    print(eng.check_production(args[0]))
+
+def _cmd_reputation_info(eng: Engine, args: List[str]):
+    print(eng.player.show_reputation())
+
+def _cmd_building_info(eng: Engine, args: List[str]):
+    print(eng.player.inner.buildings.get_building_info(args[0]))
+
+def _cmd_market_info(eng: Engine, args: List[str]):
+    print(eng.player.economy.get_market_info())
+
+def _cmd_active_effects(eng: Engine, args: List[str]):
+    print(eng.player.effect_system.get_active_effects())
+
+def _cmd_help(eng: Engine, args: List[str]):
+    print_help()
+
+def _cmd_list(eng: Engine, args: List[str]):
+    lines = eng.list_worlds_brief()
+    if lines:
+        print("\n".join(lines))
+
+def _cmd_travel(eng: Engine, args: List[str]):
+    print(eng.describe_world(_joinargs(args)))
+
+def _cmd_creatures(eng: Engine, args: List[str]):
+    print(eng.list_creatures(_joinargs(args)))
+
+def _cmd_gather(eng: Engine, args: List[str]):
+    cnt = int(args[1]) if len(args) > 1 else 1
+    print(eng.gather(args[0], cnt))
+
+def _cmd_ingest(eng: Engine, args: List[str]):
+    cnt = int(args[1]) if len(args) > 1 else None
+    print(eng.ingest(args[0], cnt))
+
+def _cmd_ingest_creature(eng: Engine, args: List[str]):
+    if len(args) == 1:
+        print(eng.ingest_creature(args[0]))
+    else:
+        print(eng.ingest_creature(args[0], args[1]))
+
+def _cmd_plant(eng: Engine, args: List[str]):
+    cnt = int(args[1]) if len(args) > 1 else 1
+    print(eng.plant(args[0], cnt))
+
+def _cmd_harvest(eng: Engine, args: List[str]):
+    cnt = int(args[1]) if len(args) > 1 else 1
+    print(eng.harvest(args[0], cnt))
+
+def _cmd_attack(eng: Engine, args: List[str]):
+    if len(args) == 1:
+        print(eng.energy_attack(args[0]))
+    elif len(args) == 2:
+        print(eng.energy_attack(args[0], args[1]))
+    else:
+        ec = float(args[2])
+        print(eng.energy_attack(args[0], args[1], ec))
+
+def _cmd_mount(eng: Engine, args: List[str]):
+    print(eng.mount(args[0], args[1]))
+
+def _cmd_unmount(eng: Engine, args: List[str]):
+    print(eng.unmount(args[0]))
+
+def _cmd_build_structure(eng: Engine, args: List[str]):
+    print(eng.build_structure(args[0]))
+
+def _cmd_create_settlement(eng: Engine, args: List[str]):
+    print(eng.create_settlement(_joinargs(args)))
+
+def _cmd_tick(eng: Engine, args: List[str]):
+    cnt = int(args[1]) if len(args) > 1 else 1
+    print(eng.tick(args[0], cnt))
+
+def _cmd_inner(eng: Engine, args: List[str]):
+    inner = eng.player.inner
+    lines = [f"العالم الداخلي: {inner.name} | حجم {inner.size_cubes}/{inner.capacity_cubes} | لقطات {len(inner.ingested_keys)}"]
+    if inner.elements:
+        lines.append("عناصر: " + ", ".join(f"{block_name(k)}({v})" for k, v in inner.elements.items()))
+    if inner.creatures:
+        lines.append("مخلوقات:")
+        # جدول العرض المسبق: بحث واحد يعيد (الاسم، الطاقة القصوى) لكل مخلوق
+        display = _SPEC_DISPLAY
+        for c in inner.creatures:
+            name, emax = display[c.spec_id]
+            health_percent = c.energy / emax * 100
+            health_color = Colors.GREEN if health_percent > 70 else Colors.YELLOW if health_percent > 30 else Colors.RED
+            summon_info = " (مستدعى)" if c.summoned else ""
+            lines.append(f"- [{c.uid}] {name} ({c.spec_id}) | {colored_text(f'طاقة={c.energy:.1f}', health_color)} | عمر={c.age}{summon_info}")
+    if inner.qi_generation_rate > 0:
+        lines.append(f"معدل توليد Qi: {inner.qi_generation_rate:.2f} لكل تيك")
+    if inner.stable_ecosystem_ticks > 0:
+        lines.append(f"استقرار بيئي: {inner.stable_ecosystem_ticks}/10 تيكس")
+    if inner.buildings.buildings:
+        lines.append("مباني: " + ", ".join(f"{k}({v})" for k, v in inner.buildings.buildings.items()))
+    if inner.settlements:
+        lines.append("مستوطنات:")
+        for s in inner.settlements:
+            lines.append(f"- {s.name}: {s.population} سكان، {s.happiness} سعادة")
+    # إخراج واحد بدل طباعة سطرًا سطرًا
+    print("\n".join(lines))
+
+def _cmd_inv(eng: Engine, args: List[str]):
+    print(eng.show_inventory())
+
+def _cmd_stats(eng: Engine, args: List[str]):
+    print(eng.show_stats())
+
+def _cmd_skills(eng: Engine, args: List[str]):
+    output = ["🎯 مهاراتك:"]
+    for sk, lv in eng.player.skills.items():
+        sk_name = eng.player.get_skill_name(sk)
+        xp = eng.player.skill_experience.get(sk, 0.0)
+        needed = lv * 100
+        output.append(f"{sk_name}: المستوى {lv} ({xp:.1f}/{needed} XP)")
+    print("\n".join(output))
+
+def _cmd_develop(eng: Engine, args: List[str]):
+    print(eng.develop_skill(args[0]))
+
+def _cmd_recipes(eng: Engine, args: List[str]):
+    print(eng.show_recipes())
+
+def _cmd_craft(eng: Engine, args: List[str]):
+    print(eng.craft_item(args[0]))
+
+def _cmd_meditate(eng: Engine, args: List[str]):
+    hours = int(args[0]) if args else 1
+    print(eng.meditate(hours))
+
+def _cmd_snapshots(eng: Engine, args: List[str]):
+    print(eng.list_snapshots())
+
+def _cmd_snapshot(eng: Engine, args: List[str]):
+    print(eng.show_snapshot(args[0]))
+
+def _cmd_delete_snapshot(eng: Engine, args: List[str]):
+    print(eng.delete_snapshot(args[0]))
+
+def _cmd_cleanup_snapshots(eng: Engine, args: List[str]):
+    keep_n = int(args[0]) if args else CONFIG["MAX_SNAPSHOTS_PER_WORLD"]
+    print(eng.cleanup_snapshots(keep_n))
+
+def _cmd_export(eng: Engine, args: List[str]):
+    fname = args[0] if args else "backup.json"
+    print(eng.export_state(fname))
+
+def _cmd_save(eng: Engine, args: List[str]):
+    print(eng.save_player())
+
+def _cmd_achievements(eng: Engine, args: List[str]):
+    print(eng.show_achievements())
+
+# جدول الأوامر الموحّد: مصدر الحقيقة الوحيد للأسماء العربية والإرسال.
+# كل صف: (الاسم الإنجليزي، الأسماء العربية/البديلة، المعالج، أدنى عدد وسائط، رسالة الاستخدام)
+# "exit" بلا معالج لأنه يعالج داخل الحلقة (يكسرها ويوقف خيط المحاكاة)،
+# وفحص عدد الوسائط يتم مركزيًا قبل الدخول في try بدل شرط داخل كل معالج
+_CommandRow = Tuple[str, Tuple[str, ...], Optional[Callable[[Engine, List[str]], None]], int, Optional[str]]
+_COMMAND_TABLE: Tuple[_CommandRow, ...] = (
+    ("list", ("قائمة",), _cmd_list, 0, None),
+    ("travel", ("عرض",), _cmd_travel, 0, None),
+    ("gather", ("جمع", "اجمع"), _cmd_gather, 1, "استخدم: جمع <id|الاسم> [عدد]"),
+    ("ingest", ("ابتلع", "ابتلاع"), _cmd_ingest, 1, "استخدم: ابتلع <id|الاسم> [عدد]"),
+    ("ingest_creature", ("ابتلع_مخلوق",), _cmd_ingest_creature, 1, "استخدم: ابتلع_مخلوق <id|الاسم> <UID>"),
+    ("ingest_settlement_creatures", ("ابتلع_من_مستوطنة",), _cmd_ingest_settlement_creatures, 1, "استخدم: ابتلع_من_مستوطنة <اسم_المستوطنة> [العدد_الأقصى]"),
+    ("creatures", ("مخلوقات",), _cmd_creatures, 0, None),
+    ("plant", ("زرع",), _cmd_plant, 1, "استخدم: زرع <مورد_id> [عدد]"),
+    ("harvest", ("حصاد",), _cmd_harvest, 1, "استخدم: حصاد <مورد_id> [عدد]"),
+    ("attack", ("هاجم", "هجوم"), _cmd_attack, 1, "استخدم: هاجم <id|الاسم> <UID> [qi_cost]"),
+    ("mount", ("تركيب",), _cmd_mount, 2, "استخدم: تركيب <id|الاسم> <نقطة>"),
+    ("unmount", ("فك",), _cmd_unmount, 1, "استخدم: فك <نقطة>"),
+    ("tick", ("tick",), _cmd_tick, 1, "استخدم: tick <id|الاسم|داخلي> [n]"),
+    ("inner", ("داخلي",), _cmd_inner, 0, None),
+    ("inv", ("مخزن",), _cmd_inv, 0, None),
+    ("stats", ("احصائيات",), _cmd_stats, 0, None),
+    ("skills", ("مهارات",), _cmd_skills, 0, None),
+    ("develop", ("طور",), _cmd_develop, 1, "استخدم: طور <اسم المهارة>"),
+    ("recipes", ("وصفات",), _cmd_recipes, 0, None),
+    ("craft", ("اصنع",), _cmd_craft, 1, "استخدم: اصنع <معرف الوصفة>"),
+    ("build_structure", ("بناء",), _cmd_build_structure, 1, "استخدم: بناء <هيكل_id>"),
+    ("create_settlement", ("مستوطنة",), _cmd_create_settlement, 1, "استخدم: مستوطنة <اسم>"),
+    # بلا اسم عربي: لا يصل إليه إلا بالاسم الإنجليزي مباشرة
+    ("show_settlement", (), _cmd_show_settlement, 1, "استخدم: مستوطنة <اسم_المستوطنة>"),
+    ("list_settlements", ("مستوطنات",), _cmd_list_settlements, 0, None),
+    ("collect_settlement", ("جمع_موارد",), _cmd_collect_settlement, 1, "استخدم: جمع_موارد <اسم_المستوطنة> [المورد] [الكمية]"),
+    ("build_in_settlement", ("بناء_مستوطنة",), _cmd_build_in_settlement, 2, "استخدم: بناء_مستوطنة <اسم_المستوطنة> <معرف_المبنى>"),
+    ("assign_profession", ("تعيين_مهنة",), _cmd_assign_profession, 3, "استخدم: تعيين_مهنة <المستوطنة> <المهنة> <العدد>"),
+    ("meditate", ("تأمل",), _cmd_meditate, 0, None),
+    ("snapshots", ("لقطات",), _cmd_snapshots, 0, None),
+    ("snapshot", ("عرض_لقطة",), _cmd_snapshot, 1, "استخدم: عرض_لقطة <مفتاح اللقطة>"),
+    ("delete_snapshot", ("حذف_لقطة",), _cmd_delete_snapshot, 1, "استخدم: حذف_لقطة <مفتاح اللقطة>"),
+    ("cleanup_snapshots", ("تنظيف_اللقطات",), _cmd_cleanup_snapshots, 0, None),
+    ("export", ("تصدير",), _cmd_export, 0, None),
+    ("save", ("حفظ",), _cmd_save, 0, None),
+    ("exit", ("خروج",), None, 0, None),
+    ("help", ("مساعدة",), _cmd_help, 0, None),
+    ("achievements", ("إنجازات",), _cmd_achievements, 0, None),
+    ("show_skills", ("مهاراتي",), _cmd_show_skills, 0, None),
+    ("train_skill", ("تدريب",), _cmd_train_skill, 2, "استخدم: تدريب <المهارة> <عدد_الساعات>"),
+    ("show_professions", ("مهن",), _cmd_show_professions, 0, None),
+    ("trade_item", ("تجارة",), _cmd_trade_item, 2, "استخدم: تجارة <شراء|بيع> <العدد>"),
+    ("check_currency", ("عملات",), _cmd_check_currency, 0, None),
+    ("check_production", ("إنتاج",), _cmd_check_production, 1, "استخدم: إنتاج <اسم_المستوطنة>"),
+    ("reputation_info", ("سمعة",), _cmd_reputation_info, 0, None),
+    ("building_info", ("معلومات_مبنى",), _cmd_building_info, 1, "استخدم: معلومات_مبنى <معرف_المبنى>"),
+    ("profession_info", ("معلومات_مهنة",), _cmd_profession_info, 1, "استخدم: معلومات_مهنة <معرف_المهنة>"),
+    ("market_info", ("السوق",), _cmd_market_info, 0, None),
+    ("active_effects", ("تأثيرات",), _cmd_active_effects, 0, None),
+)
+
+# المشتقات تُبنى مرة واحدة من الجدول: خريطة الأسماء المطبّعة، مجموعة
+# الأسماء الإنجليزية (المسار الاحتياطي)، وقاموس الإرسال O(1) لكل سطر
+_NORM_COMMANDS = {normalize_ar_text(alias): eng
+                  for eng, aliases, *_ in _COMMAND_TABLE for alias in aliases}
+_COMMAND_VALUES = frozenset(eng for eng, *_ in _COMMAND_TABLE)
+_DISPATCH = {eng: (fn, min_args, usage)
+             for eng, _, fn, min_args, usage in _COMMAND_TABLE if fn is not None}
 
 def repl_loop():
     eng = Engine()
@@ -2998,7 +3804,7 @@ def repl_loop():
             sim_mgr = SimulationManager(eng, CONFIG.get("TICK_INTERVAL_SEC",6), CONFIG.get("TICKS_PER_RUN",1))
             sim_mgr.start()
         except Exception:
-            logging.exception("Failed to start SimulationManager")
+            _LOG.exception("Failed to start SimulationManager")
     print_banner()
     while True:
         try:
@@ -3012,246 +3818,39 @@ def repl_loop():
         cmd_raw = parts[0]
         cmd_key = normalize_ar_text(cmd_raw)
         
-        mapped = None
-        for k,v in COMMANDS.items():
-            if normalize_ar_text(k) == cmd_key:
-                mapped = v
-                break
-        
-        if mapped is None and cmd_raw in COMMANDS.values():
+        mapped = _NORM_COMMANDS.get(cmd_key)
+        if mapped is None and cmd_raw in _COMMAND_VALUES:
             mapped = cmd_raw
 
         if mapped is None:
             print("أمر غير معروف. اكتب 'مساعدة'.")
             continue
 
-        args = parts[1:]
-        try:
-            # الأوامر الجديدة
-            if mapped == "list_settlements": 
-                print(eng.list_settlements())
-            elif mapped == "show_settlement": 
-                if args:
-                    print(eng.show_settlement(" ".join(args)))
-                else:
-                    print("استخدم: مستوطنة <اسم_المستوطنة>")
-            elif mapped == "collect_settlement": 
-                if len(args) >= 1:
-                    settlement_name = args[0]
-                    resource = args[1] if len(args) > 1 else None
-                    amount = int(args[2]) if len(args) > 2 else None
-                    print(eng.collect_settlement_resources(settlement_name, resource, amount))
-                else:
-                    print("استخدم: جمع_موارد <اسم_المستوطنة> [المورد] [الكمية]")
-            elif mapped == "build_in_settlement": 
-                if len(args) >= 2:
-                    settlement_name = args[0]
-                    building_id = args[1]
-                    print(eng.build_in_settlement(settlement_name, building_id))
-                else:
-                    print("استخدم: بناء_مستوطنة <اسم_المستوطنة> <معرف_المبنى>")
-            elif mapped == "ingest_settlement_creatures": 
-                if args:
-                    settlement_name = args[0]
-                    max_creatures = int(args[1]) if len(args) > 1 else None
-                    print(eng.ingest_settlement_creatures(settlement_name, max_creatures))
-                else:
-                    print("استخدم: ابتلع_من_مستوطنة <اسم_المستوطنة> [العدد_الأقصى]")
-            elif mapped == "show_skills": 
-                print(eng.show_skills())
-            elif mapped == "train_skill": 
-                if len(args) >= 2:
-                    skill = args[0]
-                    try:
-                        hours = int(args[1])
-                        print(eng.train_skill(skill, hours))
-                    except ValueError:
-                        print("عدد الساعات يجب أن يكون رقماً")
-                else:
-                    print("استخدم: تدريب <المهارة> <عدد_الساعات>")
-            elif mapped == "show_professions": 
-                print(eng.show_professions())
-            elif mapped == "profession_info":
-                if args:
-                    profession_system = ProfessionSystem()
-                    requirements = profession_system.get_profession_requirements(args[0])
-                    if requirements:
-                        print(f"متطلبات مهنة {args[0]}:")
-                        for skill, level in requirements.items():
-                            skill_name = eng.player.get_skill_name(skill)
-                            print(f"- {skill_name}: المستوى {level}")
-                    else:
-                        print("المهنة غير موجودة")
-                else:
-                    print("استخدم: معلومات_مهنة <معرف_المهنة>")
-            elif mapped == "assign_profession":
-                if len(args) >= 3:
-                    settlement = args[0]
-                    profession = args[1]
-                    try:
-                        count = int(args[2])
-                        print(eng.assign_profession(settlement, profession, count))
-                    except ValueError:
-                        print("العدد يجب أن يكون رقماً")
-                else:
-                    print("استخدم: تعيين_مهنة <المستوطنة> <المهنة> <العدد>")
-            elif mapped == "trade_item":
-                if len(args) >= 2:
-                    action = args[0]
-                    item = args[1]
-                    quantity = int(args[2]) if len(args) > 2 else 1
-                    print(eng.trade_item(action, item, quantity))
-                else:
-                    print("استخدم: تجارة <شراء|بيع> <العدد>")
-            elif mapped == "check_currency": 
-                print(eng.check_currency())
-            elif mapped == "check_production": 
-                if args:
-                    print(eng.check_production(args[0]))
-                else:
-                    print("استخدم: إنتاج <اسم_المستوطنة>")
-            elif mapped == "reputation_info": 
-                print(eng.player.show_reputation())
-            elif mapped == "building_info":
-                if args:
-                    print(eng.player.inner.buildings.get_building_info(args[0]))
-                else:
-                    print("استخدم: معلومات_مبنى <معرف_المبنى>")
-            elif mapped == "market_info":
-                print(eng.player.economy.get_market_info())
-            elif mapped == "active_effects":
-                print(eng.player.effect_system.get_active_effects())
-            
-            # الأوامر القديمة
-            elif mapped == "help": 
-                print_help()
-            elif mapped == "list": 
-                [print(l) for l in eng.list_worlds_brief()]
-            elif mapped == "travel": 
-                print(eng.describe_world(" ".join(args)))
-            elif mapped == "creatures": 
-                print(eng.list_creatures(" ".join(args)))
-            elif mapped == "gather":
-                cnt = int(args[1]) if len(args) > 1 else 1
-                print(eng.gather(args[0], cnt))
-            elif mapped == "ingest":
-                cnt = int(args[1]) if len(args) > 1 else None
-                print(eng.ingest(args[0], cnt))
-            elif mapped == "ingest_creature":
-                if len(args) == 1:
-                    print(eng.ingest_creature(args[0]))
-                else:
-                    print(eng.ingest_creature(args[0], args[1]))
-            elif mapped == "plant":
-                cnt = int(args[1]) if len(args) > 1 else 1
-                print(eng.plant(args[0], cnt))
-            elif mapped == "harvest":
-                cnt = int(args[1]) if len(args) > 1 else 1
-                print(eng.harvest(args[0], cnt))
-            elif mapped == "attack":
-                if len(args) == 1:
-                    print(eng.energy_attack(args[0]))
-                elif len(args) == 2:
-                    print(eng.energy_attack(args[0], args[1]))
-                else:
-                    ec = float(args[2])
-                    print(eng.energy_attack(args[0], args[1], ec))
-            elif mapped == "mount": 
-                print(eng.mount(args[0], args[1]))
-            elif mapped == "unmount": 
-                print(eng.unmount(args[0]))
-            elif mapped == "build_structure": 
-                print(eng.build_structure(args[0]))
-            elif mapped == "create_settlement": 
-                print(eng.create_settlement(" ".join(args)))
-            elif mapped == "tick":
-                cnt = int(args[1]) if len(args) > 1 else 1
-                print(eng.tick(args[0], cnt))
-            elif mapped == "inner":
-                inner = eng.player.inner
-                print(f"العالم الداخلي: {inner.name} | حجم {inner.size_cubes}/{inner.capacity_cubes} | لقطات {len(inner.ingested_keys)}")
-                if inner.elements: 
-                    print("عناصر:", ", ".join([f"{BLOCKS.get(k,{'name':k})['name']}({v})" for k,v in inner.elements.items()]))
-                if inner.creatures:
-                    print("مخلوقات:")
-                    for c in inner.creatures:
-                        spec = CREATURES.get(c.spec_id)
-                        health_percent = c.energy / spec.get("energy_max", 1) * 100
-                        health_color = Colors.GREEN if health_percent > 70 else Colors.YELLOW if health_percent > 30 else Colors.RED
-                        summon_info = " (مستدعى)" if c.summoned else ""
-                        print(f"- [{c.uid}] {spec['name']} ({c.spec_id}) | {colored_text(f'طاقة={c.energy:.1f}', health_color)} | عمر={c.age}{summon_info}")
-                if inner.qi_generation_rate > 0:
-                    print(f"معدل توليد Qi: {inner.qi_generation_rate:.2f} لكل تيك")
-                if inner.stable_ecosystem_ticks > 0:
-                    print(f"استقرار بيئي: {inner.stable_ecosystem_ticks}/10 تيكس")
-                if inner.buildings.buildings:
-                    print("مباني:", ", ".join([f"{k}({v})" for k,v in inner.buildings.buildings.items()]))
-                if inner.settlements:
-                    print("مستوطنات:")
-                    for s in inner.settlements:
-                        print(f"- {s.name}: {s.population} سكان، {s.happiness} سعادة")
-            elif mapped == "inv":
-                print(eng.show_inventory())
-            elif mapped == "stats":
-                print(eng.show_stats())
-            elif mapped == "skills":
-                output = ["🎯 مهاراتك:"]
-                for sk, lv in eng.player.skills.items():
-                    sk_name = eng.player.get_skill_name(sk)
-                    xp = eng.player.skill_experience.get(sk, 0.0)
-                    needed = lv * 100
-                    output.append(f"{sk_name}: المستوى {lv} ({xp:.1f}/{needed} XP)")
-                print("\n".join(output))
-            elif mapped == "develop":
-                if args:
-                    print(eng.develop_skill(args[0]))
-                else:
-                    print("استخدم: طور <اسم المهارة>")
-            elif mapped == "recipes":
-                print(eng.show_recipes())
-            elif mapped == "craft":
-                if args:
-                    print(eng.craft_item(args[0]))
-                else:
-                    print("استخدم: اصنع <معرف الوصفة>")
-            elif mapped == "meditate":
-                hours = int(args[0]) if args else 1
-                print(eng.meditate(hours))
-            elif mapped == "snapshots":
-                print(eng.list_snapshots())
-            elif mapped == "snapshot":
-                if args:
-                    print(eng.show_snapshot(args[0]))
-                else:
-                    print("استخدم: عرض_لقطة <مفتاح اللقطة>")
-            elif mapped == "delete_snapshot":
-                if args:
-                    print(eng.delete_snapshot(args[0]))
-                else:
-                    print("استخدم: حذف_لقطة <مفتاح اللقطة>")
-            elif mapped == "cleanup_snapshots":
-                keep_n = int(args[0]) if args else CONFIG["MAX_SNAPSHOTS_PER_WORLD"]
-                print(eng.cleanup_snapshots(keep_n))
-            elif mapped == "export":
-                fname = args[0] if args else "backup.json"
-                print(eng.export_state(fname))
-            elif mapped == "save":
-                print(eng.save_player())
-            elif mapped == "exit":
-                if CONFIG.get("AUTOSAVE_ON_EXIT", True):
-                    eng.save_player()
-                    eng.close()
-                if sim_mgr:
-                    sim_mgr.stop()
-                    print("تم الحفظ والخروج.")
-                break
-            elif mapped == "achievements":
-                print(eng.show_achievements())
-            else:
-                print("أمر غير معروف. اكتب 'مساعدة'.")
+        args = list(parts[1:])
 
+        # الخروج يبقى داخل الحلقة: يحتاج كسرها وإيقاف خيط المحاكاة
+        if mapped == "exit":
+            if CONFIG.get("AUTOSAVE_ON_EXIT", True):
+                eng.save_player()
+                eng.close()
+            if sim_mgr:
+                sim_mgr.stop()
+                print("تم الحفظ والخروج.")
+            break
+
+        entry = _DISPATCH.get(mapped)
+        if entry is None:
+            print("أمر غير معروف. اكتب 'مساعدة'.")
+            continue
+        handler, min_args, usage = entry
+        if len(args) < min_args:
+            print(usage or "وسائط غير كافية. اكتب 'مساعدة'.")
+            continue
+
+        try:
+            handler(eng, args)
         except Exception as e:
-            logging.exception("Command error")
+            _LOG.exception("Command error")
             print(f"خطأ في تنفيذ الأمر: {e}")
 
     if sim_mgr:
@@ -3263,7 +3862,7 @@ def main():
     try:
         repl_loop()
     except Exception as e:
-        logging.exception("حدث خطأ غير متوقع")
+        _LOG.exception("حدث خطأ غير متوقع")
         print(f"حدث خطأ غير متوقع: {e}")
         print("يرجى التحقق من ملف السجلات للمزيد من التفاصيل.")
 